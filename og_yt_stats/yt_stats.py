@@ -1,15 +1,21 @@
 import json
-import requests
 from tqdm import tqdm
 
+# yt_scrapers has to be on sys.path (see yt_stats_imple.py), the shared HTTP layer lives there
+from yt_transport import get_default_transport
+
 
 class YTstats:
 
-    def __init__(self, api_key, channel_id):
+    # videos.list accepts at most 50 ids per request
+    VIDEO_BATCH_SIZE = 50
+
+    def __init__(self, api_key, channel_id, transport=None):
         self.api_key = api_key
         self.channel_id = channel_id
         self.channel_statistics = None
         self.video_data = None
+        self.transport = transport or get_default_transport()
 
     def extract_all(self):
         self.get_channel_statistics()
@@ -21,7 +27,7 @@ class YTstats:
         url = f'https://www.googleapis.com/youtube/v3/channels?part=statistics&id={self.channel_id}&key={self.api_key}'
         pbar = tqdm(total=1)
         
-        json_url = requests.get(url)
+        json_url = self.transport.get(url)
         data = json.loads(json_url.text)
         try:
             data = data['items'][0]['statistics']
@@ -34,20 +40,60 @@ class YTstats:
         pbar.close()
         return data
 
-    def get_channel_video_data(self):
-        "Extract all video information of the channel"
+    def get_channel_video_data(self, batch=True):
+        """
+        Extract all video information of the channel
+        batch=True fetches every part for 50 videos per request,
+        batch=False keeps the old one request per video and part
+        """
         print('get video data...')
         channel_videos, channel_playlists = self._get_channel_content(limit=50)
 
         parts=["snippet", "statistics","contentDetails", "topicDetails"]
-        for video_id in tqdm(channel_videos):
-            for part in parts:
-                data = self._get_single_video_data(video_id, part)
-                channel_videos[video_id].update(data)
+        if batch:
+            video_ids = list(channel_videos)
+            for i in tqdm(range(0, len(video_ids), self.VIDEO_BATCH_SIZE)):
+                batch_ids = video_ids[i:i + self.VIDEO_BATCH_SIZE]
+                data = self._get_multiple_video_data(batch_ids, parts)
+                for video_id in batch_ids:
+                    channel_videos[video_id].update(data.get(video_id, {}))
+        else:
+            for video_id in tqdm(channel_videos):
+                for part in parts:
+                    data = self._get_single_video_data(video_id, part)
+                    channel_videos[video_id].update(data)
 
         self.video_data = channel_videos
         return channel_videos
 
+    def _get_multiple_video_data(self, video_ids, parts):
+        """
+        Extract all requested parts for up to 50 videos in one request
+        return videoId: merged data of all parts (same as the single video calls)
+        """
+
+        url = f"https://www.googleapis.com/youtube/v3/videos?part={','.join(parts)}&id={','.join(video_ids)}&key={self.api_key}"
+        json_url = self.transport.get(url)
+        data = json.loads(json_url.text)
+        if 'items' not in data:
+            print(f'Error! Could not get video data: \n{data}')
+            return dict()
+
+        videos = dict()
+        for item in data['items']:
+            merged = dict()
+            for part in parts:
+                if part in item:
+                    merged.update(item[part])
+                else:
+                    print(f"Error! Could not get {part} part of data for {item.get('id')}")
+            videos[item['id']] = merged
+
+        for video_id in video_ids:
+            if video_id not in videos:
+                print(f'Error! Could not get data for video {video_id}')
+        return videos
+
     def _get_single_video_data(self, video_id, part):
         """
         Extract further information for a single video
@@ -55,7 +101,7 @@ class YTstats:
         """
 
         url = f"https://www.googleapis.com/youtube/v3/videos?part={part}&id={video_id}&key={self.api_key}"
-        json_url = requests.get(url)
+        json_url = self.transport.get(url)
         data = json.loads(json_url.text)
         try:
             data = data['items'][0][part]
@@ -91,7 +137,7 @@ class YTstats:
         Extract all videos and playlists per page
         return channel_videos, channel_playlists, nextPageToken
         """
-        json_url = requests.get(url)
+        json_url = self.transport.get(url)
         data = json.loads(json_url.text)
         channel_videos = dict()
         channel_playlists = dict()
@@ -1,13 +1,22 @@
+import os
+import sys
+
+# The shared HTTP layer lives with the newer scrapers
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yt_scrapers'))
 import yt_stats
 from yt_stats import YTstats
+from yt_keys import APIKeyPool, load_api_keys
+from yt_quota import QuotaScheduler
+from yt_transport import YTTransport
 
-with open('api_key.txt', 'r') as file:
-    api_key = file.readline().strip()
+# api_key.txt can hold several keys, one per line
+api_keys = load_api_keys('api_key.txt')
+transport = YTTransport(quota=QuotaScheduler(), key_pool=APIKeyPool(api_keys))
 
 with open('channel_id.txt', 'r') as file:
     channel_id = [line.strip() for line in file]
     
-yt = YTstats(api_key, channel_id)
+yt = YTstats(api_keys[0], channel_id, transport)
 
 yt.extract_all()
 
@@ -15,4 +24,6 @@ yt.dump()
 
 print("Channel Statistics:")
 
-print(yt.channel_statistics)
\ No newline at end of file
+print(yt.channel_statistics)
+
+print(transport.metrics.report())
@@ -1,14 +1,16 @@
-import json
-import pandas as pd
 import os
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yt_scrapers'))
+from yt_columnar import load_dataset
+from yt_labeling import TrendingLabeler
+from yt_thresholds import TRENDING_QUANTILES, ThresholdFitter, region_of
+
+# Can also be an .ndjson dump or a Parquet dataset directory (e.g. with filters=[("region", "=", "US")])
 trending_file_path = 'sample_newest_trending_videos/24.11.12_US_trending_videos.json'
 
 # Load the trending dataset
-with open(trending_file_path, "r", encoding="utf-8") as f:
-    trending_videos = json.load(f)
-
-trending_df = pd.DataFrame.from_dict(trending_videos, orient="index")
+trending_df = load_dataset(trending_file_path)
 
 # print(f"Number of videos in trending_videos: {trending_df.shape[0]}")
 
@@ -25,17 +27,13 @@ trending_df['engagementRate'] = (trending_df['likeCount'] + trending_df['comment
 # view_stats('avgDailyViews')
 
 # Cut lower 20% of dataset based on these stats to further define trending videos
-percentiles = trending_df[['viewCount', 'likeCount', 'commentCount', 'engagementRate', 'avgDailyViews']].quantile(0.2)
+# The cutoffs are the 20% quantiles of each region and fetch date (yt_thresholds.py),
+# use fit_thresholds / filter_dataset to fit them over many trending files at once
+threshold_fitter = ThresholdFitter(TRENDING_QUANTILES).update(trending_df, region_of(trending_file_path))
 # print("20th percentiles:")
-# print(percentiles)
-
-trending_df = trending_df[
-    (trending_df["viewCount"] >= 400000)
-    & (trending_df['likeCount'] >= 10000)
-    & (trending_df['commentCount'] >= 1000)
-    & (trending_df['engagementRate'] >= 0.015)
-    & (trending_df['avgDailyViews'] >= 100000)
-]
+# print(threshold_fitter.thresholds())
+
+trending_df = threshold_fitter.filter(trending_df, region_of(trending_file_path))
 # print(f"Number of trending videos after filtering: {trending_df.shape[0]}")
 
 def view_lowest(column_name):
@@ -52,16 +50,13 @@ def view_lowest(column_name):
 # view_lowest('viewCount')
 
 # Assigning labels for trending dataset
-trending_df['isTrending'] = 1
-# Rank based on avgDailyViews and engagementRate
-trending_df['trendingPercentile'] = trending_df[['avgDailyViews', 'viewCount', 'likeCount']].rank(pct=True).mean(axis=1)
-
-trending_df['trendingPercentile'] = pd.cut(
-    trending_df['trendingPercentile'], 
-    10, 
-    labels=[0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95], 
-    include_lowest=True
-)
+# Rank based on avgDailyViews, viewCount and likeCount, then cut into 10 percentile bins
+# (same as rank(pct=True).mean(axis=1) + pd.cut(..., 10), but the breakpoints are kept
+# so that the channel dataset can be labeled against them, see yt_labeling.py)
+labeler = TrendingLabeler().fit(trending_df)
+os.makedirs("yt_processed_datasets", exist_ok=True)
+labeler.save(os.path.join("yt_processed_datasets", "trending_labeler.json"))
+trending_df = labeler.label(trending_df)
 
 # trending_df = trending_df.sort_values(by=['trendingPercentile', 'avgDailyViews', 'engagementRate'], ascending=[False, False, False])
 print_df = trending_df[['channelTitle', 'viewCount', 'likeCount', 'commentCount', 'engagementRate', 'avgDailyViews', 'trendingPercentile']]
@@ -1,30 +1,122 @@
 import json
 import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_channel_ids_from_multiple_jsons(json_folder, output_file):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yt_scrapers'))
+from yt_jsonstream import iter_string_fields
 
-    all_channel_ids = set()  # Use a set to avoid duplicate channel IDs
+
+def list_trending_files(json_folder):
+    # Indented .json dumps and streamed .ndjson[.gz|.zst] dumps, never unfinished .part files
+    return [
+        os.path.join(json_folder, file_name) for file_name in sorted(os.listdir(json_folder))
+        if (file_name.endswith('.json') or '.ndjson' in file_name) and not file_name.endswith('.part')
+    ]
+
+
+def extract_file_channel_ids(file_path):
+
+    '''
+    {channel_id: fetchedDate of its first video} of one trending file,
+    only the channelId and fetchedDate strings are decoded
+    '''
+
+    channel_ids = {}
+    fetched_date = None
+    for field, value in iter_string_fields(file_path, ("fetchedDate", "channelId")):
+        if field == "fetchedDate":
+            fetched_date = value
+        elif value not in channel_ids:
+            channel_ids[value] = fetched_date
+    return channel_ids
+
+
+def load_index(index_file):
+    if not os.path.exists(index_file):
+        return {"files": {}, "channels": {}}
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index(index, index_file):
+    with open(index_file + '.part', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(index_file + '.part', index_file)
+
+
+def extract_channel_ids_from_multiple_jsons(json_folder, output_file, index_file=None, workers=None):
+
+    '''
+    Incrementally collect the channel ids of every trending file in json_folder.
+    A sidecar index (<output_file>.index.json) remembers the files already read
+    (path, mtime and size) and when/where each channel was first seen, so only
+    new or changed files are parsed and only new channel ids are appended to output_file.
+    '''
+
+    index_file = index_file or output_file + '.index.json'
 
     try:
-        for file_name in os.listdir(json_folder):
-            # Process only `.json` files
-            if file_name.endswith('.json'):
-                file_path = os.path.join(json_folder, file_name)
-                print(f"Processing file: {file_path}")
-                
-                # Load the JSON data
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                
-                channel_ids = [video_data["channelId"] for video_id, video_data in data.items()]
-                all_channel_ids.update(channel_ids)
-        
-        with open(output_file, 'w', encoding='utf-8') as outfile:
-            outfile.write("\n".join(all_channel_ids))
-        
-        print(f"Successfully extracted {len(all_channel_ids)} unique channel IDs to {output_file}")
-    
+        index = load_index(index_file)
+        known_channels = index["channels"]
+        if not index["files"] and os.path.exists(output_file):
+            # channel_ids.txt from before the index existed, keep its ids
+            with open(output_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        known_channels.setdefault(line.strip(), {"firstSeen": None, "file": None})
+
+        new_files = {}
+        for file_path in list_trending_files(json_folder):
+            stat = os.stat(file_path)
+            signature = [stat.st_mtime_ns, stat.st_size]
+            if index["files"].get(file_path) != signature:
+                new_files[file_path] = signature
+
+        if not new_files:
+            print(f"No new files in {json_folder}, {len(known_channels)} channel IDs in {output_file}")
+            return []
+
+        new_channel_ids = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(extract_file_channel_ids, new_files, chunksize=8)
+            for file_path, channel_ids in zip(new_files, results):
+                print(f"Processed file: {file_path} ({len(channel_ids)} channels)")
+                for channel_id, fetched_date in channel_ids.items():
+                    if channel_id not in known_channels:
+                        known_channels[channel_id] = {"firstSeen": fetched_date, "file": os.path.basename(file_path)}
+                        new_channel_ids.append(channel_id)
+
+        if new_channel_ids:
+            # The old script wrote the file without a trailing newline
+            needs_newline = os.path.exists(output_file) and os.path.getsize(output_file) > 0
+            if needs_newline:
+                with open(output_file, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b'\n'
+            with open(output_file, 'a', encoding='utf-8') as outfile:
+                if needs_newline:
+                    outfile.write("\n")
+                outfile.write("\n".join(new_channel_ids) + "\n")
+
+        # Written after the ids, a crash in between only means re-reading those files
+        index["files"].update(new_files)
+        save_index(index, index_file)
+
+        print(f"Successfully added {len(new_channel_ids)} new channel IDs to {output_file} ({len(known_channels)} in total)")
+        return new_channel_ids
+
     except Exception as e:
         print(f"An error occurred: {e}")
 
-extract_channel_ids_from_multiple_jsons("sample_newest_trending_videos", "channel_ids.txt")
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json_folder", help="Directory with the trending dumps", default="sample_newest_trending_videos")
+    parser.add_argument("--output_file", help="File the channel IDs are appended to, one per line", default="channel_ids.txt")
+    parser.add_argument("--index_file", help="Sidecar index of processed files and first seen channels (default <output_file>.index.json)", default=None)
+    parser.add_argument("--workers", help="Number of files parsed in parallel", type=int, default=None)
+
+    args = parser.parse_args()
+    extract_channel_ids_from_multiple_jsons(args.json_folder, args.output_file, args.index_file, args.workers)
@@ -1,30 +1,143 @@
 import os
-import json
+import sys
+import argparse
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yt_scrapers'))
+from yt_jsonstream import iter_records
+from yt_writers import NDJSONWriter, COMPRESSION_EXTENSIONS
 
 # Path to the directory containing your JSON files
 channel_dir = "sample_youtube_statistics"
 output_dir = "yt_processed_datasets"
 
-output_file_name = "combined_channel_data.json"
-output_path = os.path.join(output_dir, output_file_name)
+output_file_name = "combined_channel_data.ndjson"
+
+
+def list_dumps(directory):
+    # Indented _videos.json dumps and streamed _videos.ndjson[.gz|.zst] dumps, never unfinished .part files
+    # (the crawler also writes _channel_info.json files to the same directory)
+    files = [
+        os.path.join(directory, file) for file in sorted(os.listdir(directory))
+        if (file.endswith("_videos.json") or "_videos.ndjson" in file) and not file.endswith(".part")
+    ]
+    return files
+
+
+def index_file(file_path):
+
+    '''
+    Pass 1 (one process per file): stream the dump and only keep video_id -> fetchedDate
+    '''
+
+    return {
+        video_id: record.get("fetchedDate", "")
+        for video_id, record in iter_records(file_path) if isinstance(record, dict)
+    }
+
+
+def write_winners(file_path, winners, part_path, output_format, compression):
+
+    '''
+    Pass 2 (one process per file): stream the dump again and write the records
+    this file won to its own part file, returns the number of records written
+    '''
+
+    if output_format == "parquet":
+        from yt_columnar import _require_pyarrow, records_to_table
+        _, pq = _require_pyarrow()
+        # One channel dump fits in memory, it's the whole corpus that doesn't
+        records = {
+            video_id: record for video_id, record in iter_records(file_path)
+            if video_id in winners and isinstance(record, dict)
+        }
+        if records:
+            pq.write_table(records_to_table(records), part_path + ".parquet.part", compression="zstd")
+            os.replace(part_path + ".parquet.part", part_path + ".parquet")
+        return len(records)
+
+    count = 0
+    with NDJSONWriter(part_path, compression) as writer:
+        for video_id, record in iter_records(file_path):
+            if video_id in winners and isinstance(record, dict):
+                writer.write(video_id, record)
+                count += 1
+    return count
+
+
+def combine(channel_dir, output_path, workers=None, output_format="ndjson", compression=None):
+
+    '''
+    Memory bounded combine of every channel dump in channel_dir.
+    A video present in several dumps keeps its newest fetchedDate (later file wins ties).
+    Only the video_id -> (fetchedDate, file) index is held in memory, records are
+    streamed straight from the input files to the output.
+    '''
+
+    files = list_dumps(channel_dir)
+    print(f"Indexing {len(files)} files...")
+
+    newest = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_index, dates in enumerate(executor.map(index_file, files)):
+            print(f"Indexed {files[file_index]} ({len(dates)} videos)")
+            for video_id, fetched_date in dates.items():
+                if video_id not in newest or fetched_date >= newest[video_id][0]:
+                    newest[video_id] = (fetched_date, file_index)
+
+    winners = [set() for _ in files]
+    for video_id, (_, file_index) in newest.items():
+        winners[file_index].add(video_id)
+    del newest
+
+    if output_format == "parquet":
+        # A Parquet dataset directory, one file per input dump, without the default .ndjson name
+        # (load_dataset and other readers go by the name)
+        root, extension = os.path.splitext(output_path)
+        if extension == ".ndjson":
+            output_path = root
+        parts_dir = output_path
+    else:
+        parts_dir = output_path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    part_paths = [os.path.join(parts_dir, f"part-{file_index:05d}") for file_index in range(len(files))]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = list(executor.map(
+            write_winners, files, winners, part_paths,
+            [output_format] * len(files), [compression] * len(files),
+        ))
+
+    if output_format != "parquet":
+        # Concatenate the parts (gzip and zstd streams can be concatenated too)
+        extension = COMPRESSION_EXTENSIONS[compression]
+        output_path += extension
+        with open(output_path + ".part", "wb") as out:
+            for part_path in part_paths:
+                with open(part_path + extension, "rb") as part:
+                    shutil.copyfileobj(part, out)
+        os.replace(output_path + ".part", output_path)
+        shutil.rmtree(parts_dir)
 
+    print(f"Combined {sum(counts)} unique videos from {len(files)} files into {output_path}.")
+    return output_path
 
-combined_data = {}
 
-for file in os.listdir(channel_dir):
-    if file.endswith(".json"):
-        file_path = os.path.join(channel_dir, file)
-        print(f"Loading {file_path}...")
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            combined_data.update(data)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channel_dir", help="Directory with the channel dumps", default=channel_dir)
+    parser.add_argument("--output_dir", help="Directory to save the combined dataset", default=output_dir)
+    parser.add_argument("--output_file_name", help="Name of the combined dataset (.ndjson is dropped for parquet)", default=output_file_name)
+    parser.add_argument("--output_format", help="ndjson (one file) or parquet (dataset directory)", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--compression", help="Compression of the ndjson output", choices=["gzip", "zstd"], default=None)
+    parser.add_argument("--workers", help="Number of files processed in parallel", type=int, default=None)
 
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-    print(f"Created directory: {output_dir}")
+    args = parser.parse_args()
 
-# Save the combined data to the specified path
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(combined_data, f, ensure_ascii=False, indent=4)
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+        print(f"Created directory: {args.output_dir}")
 
-print(f"Combined JSON saved to {output_path}.")
\ No newline at end of file
+    output_path = os.path.join(args.output_dir, args.output_file_name)
+    combine(args.channel_dir, output_path, args.workers, args.output_format, args.compression)
@@ -1,38 +1,42 @@
-import json
-import pandas as pd
 import os
+import sys
 
-combined_channel_data_file_path = 'yt_processed_datasets/combined_channel_data.json'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yt_scrapers'))
+from yt_columnar import load_dataset, save_dataset
+from yt_labeling import TrendingLabeler
+from yt_thresholds import CHANNEL_QUANTILES, ThresholdFitter
 
-# Load the combined channel dataset
-with open(combined_channel_data_file_path, "r", encoding="utf-8") as f:
-    combined_channel_data = json.load(f)
+# Can also be an .ndjson dump or a Parquet dataset directory
+combined_channel_data_file_path = 'yt_processed_datasets/combined_channel_data.ndjson'
+# Use processed_channel_data.parquet for typed columnar output
+output_file_name = "processed_channel_data.json"
 
-# Convert both datasets to pandas DataFrames
-combined_df = pd.DataFrame.from_dict(combined_channel_data, orient="index")
+# Load the combined channel dataset
+combined_df = load_dataset(combined_channel_data_file_path)
 
 print(f"Number of videos in channel_data: {combined_df.shape[0]}")
 
 # Cut lower 10% of dataset (these stats) to eliminate data with missing values
-percentiles = combined_df[['viewCount', 'likeCount', 'commentCount', 'avgDailyViews', 'engagementRate']].quantile(0.1)
+# The cutoffs are the 10% quantiles of the whole dataset (yt_thresholds.py, one group),
+# filter_dataset does the same over many files without loading them together
+threshold_fitter = ThresholdFitter(CHANNEL_QUANTILES, group_by=()).update(combined_df)
 # print("10th percentiles:")
-# print(percentiles)
-
-combined_df = combined_df[
-    (combined_df["viewCount"] >= 92000)
-    & (combined_df['likeCount'] >= 2000)
-    & (combined_df['commentCount'] >= 70)
-    & (combined_df['engagementRate'] >= 0.001) # Set to 0.001 because of the low engagement rate (ex: music videos)
-    & (combined_df['avgDailyViews'] >= 170)
-]
+# print(threshold_fitter.thresholds())
+
+combined_df = threshold_fitter.filter(combined_df)
 print(f"Number of trending videos after filtering: {combined_df.shape[0]}")
 
+# Label isTrending / trendingPercentile with the breakpoints fitted by 0_data_trend_explore.py
+# (for the full corpus use yt_labeling.label_dataset, it streams the file in chunks)
+labeler_file_path = 'yt_processed_datasets/trending_labeler.json'
+if os.path.exists(labeler_file_path):
+    combined_df = TrendingLabeler.load(labeler_file_path).label(combined_df)
+    print(f"Number of videos labeled isTrending: {combined_df['isTrending'].sum()}")
+
 
 
 
 
 output_dir_2 = "yt_processed_datasets"
-combined_json = combined_df.to_json(orient="index", force_ascii=False, indent=4)
-with open(os.path.join(output_dir_2, "processed_channel_data.json"), "w", encoding="utf-8") as f:
-    f.write(combined_json)    
-print(f"Combined channel_data JSON saved to {output_dir_2}.")
\ No newline at end of file
+save_dataset(combined_df, os.path.join(output_dir_2, output_file_name))
+print(f"Combined channel_data saved to {output_dir_2}.")
\ No newline at end of file
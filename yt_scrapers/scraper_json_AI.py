@@ -1,20 +1,64 @@
 import requests
-import sys
 import time
 import os
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
+from yt_cache import ResponseCache
+from yt_checkpoint import CheckpointJournal
+from yt_columnar import write_parquet
+from yt_features import page_features
+from yt_keys import APIKeyPool, load_api_keys
+from yt_pages import aiter_pages, iter_pages
+from yt_quota import QuotaExceeded, QuotaScheduler
+from yt_records import TEXT_MODES, json_default, make_record
+from yt_snapshots import SnapshotStore
+from yt_transport import YTTransport, get_default_transport
+from yt_video_index import VideoIndex
+from yt_writers import NDJSONWriter
+
 
 class YouTubeScraper:
     
     RECORDED_UTC_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         
-    def __init__(self, api_key, country_codes, output_dir="output/"):
+    def __init__(self, api_key, country_codes, output_dir="output/", max_workers=1, transport=None,
+                 output_format="json", compression=None, snapshot_store=None, compact_records=False,
+                 text_fields="keep", max_pages=None, max_videos=None, video_index=None, checkpoint=None):
         self.api_key = api_key
         self.country_codes = country_codes
         self.output_dir = output_dir
+        # Number of countries crawled at the same time, 1 keeps the old sequential loop
+        self.max_workers = max_workers
+        # Pooled session with retries, shared by every worker
+        self.transport = transport or get_default_transport()
+        # Request counters come from the transport, the scraper adds its stage timings
+        self.metrics = self.transport.metrics
+        # "json" dumps one indented file per country at the end,
+        # "ndjson" streams one record per line as the pages arrive (compression: None, "gzip" or "zstd"),
+        # "parquet" writes typed columns partitioned by fetch date and region (see yt_columnar.py)
+        self.output_format = output_format
+        self.compression = compression
+        # Optional SnapshotStore, every crawl also appends its counters and ranks there
+        self.snapshot_store = snapshot_store
+        # Optional VideoIndex, keeps the regions / first and last seen / best rank of every video
+        self.video_index = video_index
+        # Optional CheckpointJournal, a restarted run skips the finished countries
+        # and continues the unfinished ones from their last page
+        self.checkpoint = checkpoint
+        # Countries whose crawl stopped on an error, they are not marked finished
+        self.failed_countries = set()
+        # Set once the quota runs out, the countries not started yet are skipped
+        self.quota_exhausted = False
+        # compact_records keeps VideoRecords (slots, interned strings) instead of dicts,
+        # text_fields "drop" or "compress" also slims down description and tags (see yt_records.py)
+        self.compact_records = compact_records
+        self.text_fields = text_fields
+        # Stop each country after this many pages / videos (None = the whole chart)
+        self.max_pages = max_pages
+        self.max_videos = max_videos
 
         self.snippet_features = ["title", "publishedAt", "channelTitle", "description"]
 
@@ -64,70 +108,80 @@ class YouTubeScraper:
         if page_token:
             request_url += f"&pageToken={page_token}"
 
-        request = requests.get(request_url)
+        try:
+            request = self.transport.get(request_url)
+        except requests.exceptions.RequestException as e:
+            print(f"Network error occurred: {e}")
+            self.failed_countries.add(country_code)
+            return {}
+        except QuotaExceeded as e:
+            # Stop this country here, the pages already crawled still get written
+            print(f"Quota exhausted while scraping {country_code}: {e}")
+            self.failed_countries.add(country_code)
+            self.quota_exhausted = True
+            return {}
 
         if request.status_code == 429:
-            print("Temp-banned due to excess requests, please wait and continue later")
-            sys.exit()
+            print(f"Still rate limited after retries, skipping the rest of {country_code}")
+            self.failed_countries.add(country_code)
+            return {}
         elif request.status_code != 200:
             print(f"Error: {request.status_code} - {request.text}")
+            self.failed_countries.add(country_code)
             return {}
 
-        return request.json()
+        with self.metrics.stage("json_decode"):
+            return request.json()
 
     def parse_duration(self, duration_str):
-        """Return duration in ISO 8601 format or a default value."""
+        """Return duration in ISO 8601 format or a default value (durationSeconds holds the parsed value)."""
         return duration_str if duration_str else "PT0S"
 
     
     def get_videos(self, items):
-        
-        videos = {}
-        
-        for video in items:
-            if "statistics" not in video or "contentDetails" not in video or "snippet" not in video:
-                continue
-
-            video_id = video.get("id", "")
-            snippet = video["snippet"]
-            statistics = video["statistics"]
-            content_details = video["contentDetails"]
-            topic_details = video.get("topicDetails", {})
-
-            category_id = snippet.get('categoryId', "N/A")
-            category_name = self.CATEGORY_MAPPING.get(category_id, "Unknown")
-            
-            raw_topic_categories = topic_details.get('topicCategories', None)
-            processed_topic_categories = self.process_topic_categories(raw_topic_categories)
-            
-            published_at = snippet.get('publishedAt', None)
-            view_count = statistics.get('viewCount', 0)
-            
-            exact_elapsed_days = self.calculate_exact_elapsed_days(published_at)
-            average_views_per_day = self.calculate_average_views_per_day(view_count, exact_elapsed_days)  
-            
-            # Construct video data
-            video_data = {
-                'fetchedDate': self.RECORDED_UTC_TIME,
-                "publishedAt": published_at,
-                'elapsedDays': round(float(exact_elapsed_days), 4),
-                "title": snippet.get("title", ""),
-                "description": snippet.get("description", ""),
-                "channelTitle": snippet.get("channelTitle", ""),
-                "channelId": snippet.get("channelId", ""),
-                "tags": snippet.get("tags", None),
-                "category": category_name,
-                "duration": self.parse_duration(content_details.get("duration", "")),
-                "licensedContent": content_details.get("licensedContent", False),
-                "viewCount": int(view_count),
-                'avgDailyViews': round(float(average_views_per_day), 2),
-                "likeCount": int(statistics.get("likeCount", 0)),
-                "commentCount": int(statistics.get("commentCount", 0)),
-                "topicCategories": processed_topic_categories,
-            }
-
-            # Add video data to dictionary with video_id as key
-            videos[video_id] = video_data
+        # Feature computation and record building, timed as one stage
+        with self.metrics.stage("features"):
+            videos = {}
+            items = [
+                video for video in items
+                if "statistics" in video and "contentDetails" in video and "snippet" in video
+            ]
+            # elapsedDays, avgDailyViews, category... for the whole page at once
+            features = page_features(items, self.RECORDED_UTC_TIME, self.CATEGORY_MAPPING)
+
+            for video, feature in zip(items, features.itertuples(index=False)):
+                video_id = video.get("id", "")
+                snippet = video["snippet"]
+                content_details = video["contentDetails"]
+                topic_details = video.get("topicDetails", {})
+
+                raw_topic_categories = topic_details.get('topicCategories', None)
+                processed_topic_categories = self.process_topic_categories(raw_topic_categories)
+
+                # Construct video data
+                video_data = {
+                    'fetchedDate': self.RECORDED_UTC_TIME,
+                    "publishedAt": snippet.get('publishedAt', None),
+                    'elapsedDays': float(feature.elapsedDays),
+                    "title": snippet.get("title", ""),
+                    "description": snippet.get("description", ""),
+                    "channelTitle": snippet.get("channelTitle", ""),
+                    "channelId": snippet.get("channelId", ""),
+                    "tags": snippet.get("tags", None),
+                    "category": feature.category,
+                    "duration": self.parse_duration(content_details.get("duration", "")),
+                    "durationSeconds": int(feature.durationSeconds),
+                    "isShort": bool(feature.isShort),
+                    "licensedContent": content_details.get("licensedContent", False),
+                    "viewCount": int(feature.viewCount),
+                    'avgDailyViews': float(feature.avgDailyViews),
+                    "likeCount": int(feature.likeCount),
+                    "commentCount": int(feature.commentCount),
+                    "topicCategories": processed_topic_categories,
+                }
+
+                # Add video data to dictionary with video_id as key
+                videos[video_id] = make_record(video_data, self.compact_records, self.text_fields)
 
         return videos
     
@@ -150,39 +204,97 @@ class YouTubeScraper:
         
         return processed_categories
 
-    def calculate_exact_elapsed_days(self, published_time):
-            
+    def iter_video_pages(self, country_code, max_pages=None, max_videos=None, prefetch=True, page_token="",
+                         with_tokens=False):
+
         '''
-        Calculate the exact elapsed days from the published time
+        Lazily yield the trending videos of a country one page ({video_id: record}) at a time,
+        the next page is fetched while the caller handles the current one (see yt_pages.iter_pages).
+        max_pages / max_videos default to the ones given to the scraper.
         '''
-        
-        published_dt = datetime.strptime(published_time, "%Y-%m-%dT%H:%M:%SZ")
-        elapsed = datetime.strptime(self.RECORDED_UTC_TIME, "%Y-%m-%dT%H:%M:%SZ") - published_dt
-        elapsed_days = elapsed.total_seconds() / 60 / 60 / 24
-        return f'{elapsed_days:.4f}'
-    
-    
-    def calculate_average_views_per_day(self, view_count, exact_elapsed_days):
-            
+
+        def fetch_page(page_token):
+            return self.api_request(page_token, country_code)
+
+        max_pages = max_pages or self.max_pages
+        max_videos = max_videos or self.max_videos
+        for items, next_page_token in iter_pages(fetch_page, max_pages, max_videos, prefetch, page_token, with_tokens=True):
+            videos = self.get_videos(items)
+            yield (videos, next_page_token) if with_tokens else videos
+
+    async def aiter_video_pages(self, country_code, max_pages=None, max_videos=None, prefetch=True):
+
         '''
-        Calculate the average views per day
+        Async version of iter_video_pages (the requests run in worker threads)
         '''
-        
-        return f'{int(view_count) / float(exact_elapsed_days):.2f}'
-    
-    
+
+        def fetch_page(page_token):
+            return self.api_request(page_token, country_code)
+
+        max_pages = max_pages or self.max_pages
+        max_videos = max_videos or self.max_videos
+        async for items in aiter_pages(fetch_page, max_pages, max_videos, prefetch):
+            yield self.get_videos(items)
+
+    def crawl_pages(self, country_code):
+
+        '''
+        Pages of a country for get_pages / stream_pages as (videos, is_new).
+        With a checkpoint every page is journaled as it arrives, and the pages of an
+        interrupted run come back first (is_new False) before the crawl continues
+        from the saved page token.
+        '''
+
+        page_token = ""
+        if self.checkpoint is not None:
+            for videos in self.checkpoint.pages(country_code):
+                yield videos, False
+            page_token = self.checkpoint.resume_token(country_code)
+            if page_token is None:
+                return
+
+        for videos, next_page_token in self.iter_video_pages(country_code, page_token=page_token, with_tokens=True):
+            if self.checkpoint is not None:
+                self.checkpoint.record_page(country_code, next_page_token, videos)
+            yield videos, True
+
     def get_pages(self, country_code):
         country_data = {}
-        next_page_token = ""
+        for videos, _ in self.crawl_pages(country_code):
+            country_data.update(videos)
+        return country_data
 
-        while next_page_token is not None:
-            video_data_page = self.api_request(next_page_token, country_code)
-            next_page_token = video_data_page.get("nextPageToken", None)
+    def stream_pages(self, country_code):
 
-            items = video_data_page.get("items", [])
-            country_data.update(self.get_videos(items))
+        '''
+        Same as get_pages + write_to_file but each page is written to an NDJSON
+        file as soon as it arrives, nothing is kept in memory
+        '''
 
-        return country_data
+        file_path = self._output_path(country_code, "ndjson")
+
+        with NDJSONWriter(file_path, self.compression) as writer:
+            for videos, is_new in self.crawl_pages(country_code):
+                if is_new:
+                    # Pages from the checkpoint were recorded by the interrupted run
+                    self.record_snapshot(country_code, videos, start_rank=writer.count + 1)
+                with self.metrics.stage("serialization"):
+                    writer.write_many(videos)
+
+        print(f"{writer.count} videos streamed to {writer.path}")
+        return writer.count
+
+    def record_snapshot(self, country_code, videos, start_rank=1):
+        if not videos or (self.snapshot_store is None and self.video_index is None):
+            return
+        with self.metrics.stage("indexing"):
+            if self.snapshot_store is not None:
+                self.snapshot_store.add_crawl(country_code, self.RECORDED_UTC_TIME, videos, start_rank)
+            if self.video_index is not None:
+                self.video_index.add_page(country_code, self.RECORDED_UTC_TIME, videos, start_rank)
+
+    def _output_path(self, country_code, extension):
+        return os.path.join(self.output_dir, f"{time.strftime('%y.%d.%m')}_{country_code}_trending_videos.{extension}")
 
     def write_to_file(self, country_code, country_data):
         print(f"Writing {country_code} data to file...")
@@ -190,32 +302,139 @@ class YouTubeScraper:
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
-        file_path = os.path.join(self.output_dir, f"{time.strftime('%y.%d.%m')}_{country_code}_trending_videos.json")
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(country_data, file, ensure_ascii=False, indent=4)
+        file_path = self._output_path(country_code, "json")
+        with self.metrics.stage("serialization"), open(file_path, "w", encoding="utf-8") as file:
+            json.dump(country_data, file, ensure_ascii=False, indent=4, default=json_default)
 
         print(f"Data successfully written to {file_path}")
 
+    def scrape_country(self, country_code):
+        if self.quota_exhausted:
+            return country_code
+        if self.checkpoint is not None and self.checkpoint.is_done(country_code):
+            print(f"Skipping {country_code}, already finished according to the checkpoint")
+            return country_code
+
+        print(f"Scraping data for country: {country_code}")
+        if self.output_format == "ndjson":
+            count = self.stream_pages(country_code)
+            self._mark_done(country_code, count)
+            return country_code
+
+        country_data = self.get_pages(country_code)
+        self.record_snapshot(country_code, country_data)
+        if self.output_format == "parquet":
+            with self.metrics.stage("serialization"):
+                file_path = write_parquet(
+                    country_data, self.output_dir,
+                    name=f"{time.strftime('%y.%d.%m')}_{country_code}_trending_videos",
+                    partitions={"region": country_code},
+                    fetch_date=self.RECORDED_UTC_TIME[:10],
+                )
+            print(f"Data successfully written to {file_path}")
+            self._mark_done(country_code, len(country_data))
+            return country_code
+
+        self.write_to_file(country_code, country_data)
+        self._mark_done(country_code, len(country_data))
+        return country_code
+
+    def _mark_done(self, country_code, count):
+        if self.checkpoint is None:
+            return
+        if country_code in self.failed_countries:
+            print(f"{country_code} stopped on an error, it will be resumed from the checkpoint next run")
+            return
+        self.checkpoint.mark_done(country_code, videos=count)
+
     def scrape_data(self):
-        for country_code in self.country_codes:
-            print(f"Scraping data for country: {country_code}")
-            country_data = self.get_pages(country_code)
-            self.write_to_file(country_code, country_data)
+        if self.max_workers <= 1:
+            for country_code in self.country_codes:
+                try:
+                    self.scrape_country(country_code)
+                except QuotaExceeded as e:
+                    print(f"Quota exhausted while scraping {country_code}: {e}")
+                    self.quota_exhausted = True
+                if self.quota_exhausted:
+                    print("Quota exhausted, skipping the remaining countries")
+                    break
+            self._finish_checkpoint()
+            return
+
+        # Each country paginates on its own worker, countries run concurrently
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {executor.submit(self.scrape_country, country_code): country_code for country_code in self.country_codes}
+        try:
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except QuotaExceeded as e:
+                    print(f"Quota exhausted while scraping {futures[future]}: {e}")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                except Exception as e:
+                    print(f"Error scraping {futures[future]}: {e}")
+        except BaseException:
+            # e.g. Ctrl+C, stop the countries not started yet
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        self._finish_checkpoint()
+
+    def _finish_checkpoint(self):
+        # Start fresh next time once every country is finished, otherwise keep it to resume
+        if self.checkpoint is not None and all(self.checkpoint.is_done(country_code) for country_code in self.country_codes):
+            self.checkpoint.clear()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--key_path", help="Path to the file containing the API key", default="api_key.txt")
+    parser.add_argument("--key_path", help="Path to the file containing the API keys, one per line", default="api_key.txt")
     parser.add_argument("--country_code_path", help="Path to the file containing the list of country codes", default="country_codes.txt")
     parser.add_argument("--output_dir", help="Path to save the outputted files", default="sample_newest_trending_videos/")
+    parser.add_argument("--workers", help="Number of countries scraped concurrently", type=int, default=1)
+    parser.add_argument("--max_connections", help="Maximum open connections to the API host", type=int, default=10)
+    parser.add_argument("--daily_quota", help="Daily quota units available for each API key", type=int, default=10000)
+    parser.add_argument("--units_per_second", help="Spread the quota units, at most this many per second", type=float, default=None)
+    parser.add_argument("--cache_path", help="SQLite file used to cache API responses between runs", default=None)
+    parser.add_argument("--output_format", help="json (one indented file per country), ndjson (streamed, one record per line) or parquet (partitioned columns)", choices=["json", "ndjson", "parquet"], default="json")
+    parser.add_argument("--compression", help="Compression of the ndjson files", choices=["gzip", "zstd"], default=None)
+    parser.add_argument("--snapshot_db", help="SQLite snapshot store that every crawl is appended to", default=None)
+    parser.add_argument("--video_index", help="SQLite cross-region index of the trending videos (see yt_video_index.py)", default=None)
+    parser.add_argument("--checkpoint", help="Journal file to resume an interrupted run from", default=None)
+    parser.add_argument("--compact_records", help="Keep the videos in memory as compact records instead of dicts", action="store_true")
+    parser.add_argument("--text_fields", help="keep, drop or compress (in memory) the description and tags", choices=TEXT_MODES, default="keep")
+    parser.add_argument("--max_pages", help="Stop each country after this many pages of 50 videos", type=int, default=None)
+    parser.add_argument("--max_videos", help="Stop each country after this many videos", type=int, default=None)
+    parser.add_argument("--metrics_json", help="Write the request/stage metrics of the run to this JSON file", default=None)
+    parser.add_argument("--metrics_prom", help="Write the metrics in the Prometheus text format to this file", default=None)
 
     args = parser.parse_args()
 
-    with open(args.key_path, "r") as file:
-        api_key = file.readline().strip()
+    api_keys = load_api_keys(args.key_path)
 
     with open(args.country_code_path, "r") as file:
         country_codes = [line.strip() for line in file]
 
-    scraper = YouTubeScraper(api_key, country_codes, args.output_dir)
-    scraper.scrape_data()
\ No newline at end of file
+    quota = QuotaScheduler(args.daily_quota, args.units_per_second)
+    cache = ResponseCache(args.cache_path) if args.cache_path else None
+    # Requests are spread over every key in the file
+    transport = YTTransport(max_connections=args.max_connections, quota=quota, key_pool=APIKeyPool(api_keys), cache=cache)
+    snapshot_store = SnapshotStore(args.snapshot_db) if args.snapshot_db else None
+    video_index = VideoIndex(args.video_index) if args.video_index else None
+    checkpoint = CheckpointJournal(args.checkpoint) if args.checkpoint else None
+    scraper = YouTubeScraper(api_keys[0], country_codes, args.output_dir,
+                             max_workers=args.workers,
+                             transport=transport,
+                             output_format=args.output_format,
+                             compression=args.compression,
+                             snapshot_store=snapshot_store,
+                             compact_records=args.compact_records,
+                             text_fields=args.text_fields,
+                             max_pages=args.max_pages,
+                             max_videos=args.max_videos,
+                             video_index=video_index,
+                             checkpoint=checkpoint)
+    scraper.scrape_data()
+    print(f"Quota usage: {quota.summary()}")
+    transport.metrics.export(args.metrics_json, args.metrics_prom)
\ No newline at end of file
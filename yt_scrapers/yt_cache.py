@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+
+class ResponseCache:
+
+    '''
+    Persistent SQLite cache of API responses.
+    Entries are keyed by endpoint + query params without the API key,
+    so a response fetched with one key is reused with any other.
+    A fresh entry is served without a request, a stale one is revalidated
+    with its ETag (If-None-Match) and only re-downloaded if it changed.
+    '''
+
+    # Seconds an entry is served without asking the API again
+    DEFAULT_TTLS = {
+        "channels": 24 * 3600,
+        "playlistItems": 3600,
+        "videos": 3600,
+        "search": 3600,
+        # videos?chart=mostPopular changes all the time, always revalidate
+        "trending": 0,
+    }
+
+    def __init__(self, path="yt_cache.sqlite", ttls=None):
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "cache_key TEXT PRIMARY KEY, etag TEXT, body BLOB, fetched_at REAL)"
+        )
+        self.conn.commit()
+
+    def cache_key(self, url):
+
+        '''
+        Return (cache_key, ttl) of a request url
+        '''
+
+        parsed = urlparse(url)
+        endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+        params = sorted((name, value) for name, value in parse_qsl(parsed.query) if name != "key")
+        if endpoint == "videos" and any(name == "chart" for name, _ in params):
+            ttl = self.ttls.get("trending", 0)
+        else:
+            ttl = self.ttls.get(endpoint, 0)
+        return f"{endpoint}?{urlencode(params)}", ttl
+
+    def get(self, url):
+
+        '''
+        Return (body, etag, fresh) for a cached url or None
+        '''
+
+        cache_key, ttl = self.cache_key(url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, body, fetched_at FROM responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, body, fetched_at = row
+        return zlib.decompress(body), etag, time.time() - fetched_at < ttl
+
+    def put(self, url, body, etag=None):
+        cache_key, _ = self.cache_key(url)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, etag, body, fetched_at) VALUES (?, ?, ?, ?)",
+                (cache_key, etag, zlib.compress(body), time.time()),
+            )
+            self.conn.commit()
+
+    def touch(self, url):
+        # A 304 means the cached body is still current, restart its TTL
+        cache_key, _ = self.cache_key(url)
+        with self.lock:
+            self.conn.execute("UPDATE responses SET fetched_at = ? WHERE cache_key = ?", (time.time(), cache_key))
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
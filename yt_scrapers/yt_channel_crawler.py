@@ -0,0 +1,251 @@
+import argparse
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from yt_stats_self_test_AI import YTStatsProMax, get_bulk_channel_statistics, most_common_category
+from yt_cache import ResponseCache
+from yt_checkpoint import CheckpointJournal
+from yt_keys import APIKeyPool, load_api_keys
+from yt_metrics import get_metrics
+from yt_quota import QuotaExceeded, QuotaScheduler
+from yt_records import TEXT_MODES
+from yt_transport import YTTransport
+
+
+class RateLimiter:
+
+    '''
+    Global limiter shared by every worker thread,
+    spaces the requests so that at most `rate` of them start per second
+    '''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(self.next_time, now) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def crawl_channel(api_key, channel_id, directory=None, transport=None, statistics=False, incremental=False,
+                  output_format="json", compression=None, compact_records=False, text_fields="keep",
+                  categories=None):
+
+    '''
+    Crawl a single channel and dump its video data (and optionally its statistics),
+    raises if nothing could be fetched so the caller can count it as failed.
+    With a categories dict, the channelCategory is stored there instead of fetching
+    the statistics right away (crawl_channels fetches them in bulk afterwards).
+    '''
+
+    yt = YTStatsProMax(api_key, channel_id, transport=transport, show_progress=False,
+                       compact_records=compact_records, text_fields=text_fields)
+    yt.extract_video_data(directory=directory, incremental=incremental, output_format=output_format,
+                          compression=compression)
+    if not yt.video_data:
+        raise RuntimeError("no video data fetched")
+    if categories is not None:
+        categories[channel_id] = most_common_category(yt.video_data)
+    elif statistics:
+        yt.extract_channel_statistics(directory=directory)
+    return len(yt.video_data)
+
+
+def crawl_channels(api_keys, channel_ids, directory=None, workers=8, requests_per_second=10, statistics=False,
+                   quota=None, cache=None, incremental=False, output_format="json", compression=None,
+                   compact_records=False, text_fields="keep", checkpoint=None, metrics=None):
+
+    '''
+    Fan the channels out over a pool of worker threads.
+    A failing channel never stops the others, it is just reported,
+    only running out of quota stops the channels that have not started yet.
+    api_keys can be a single key or a list of keys, requests are spread over all of them.
+    cache is an optional ResponseCache, so unchanged pages are not downloaded again.
+    incremental reuses the previous dumps in directory and only refreshes their statistics.
+    output_format "ndjson" streams every channel to its file while it is fetched.
+    compact_records / text_fields shrink the records held by each worker (see yt_records.py).
+    checkpoint is an optional CheckpointJournal: channels it lists as finished are skipped,
+    every channel is marked finished once dumped, so a restarted run continues where it stopped.
+    With statistics the journal also records whether the channel statistics were dumped, channels
+    whose videos are done but not their statistics (quota stop, crash) get them on the next run.
+    metrics is an optional CrawlMetrics for the requests and stage timings (the shared one by default).
+    Returns (succeeded, failed): {channel_id: video count}, {channel_id: error}
+    '''
+
+    if isinstance(api_keys, str):
+        api_keys = [api_keys]
+    api_key = api_keys[0]
+
+    all_channel_ids = channel_ids
+    if checkpoint is not None:
+        channel_ids = [channel_id for channel_id in channel_ids if not checkpoint.is_done(channel_id)]
+        if len(channel_ids) < len(all_channel_ids):
+            print(f"Skipping {len(all_channel_ids) - len(channel_ids)} channels already finished according to the checkpoint")
+    # Channels whose videos an earlier run dumped, but not their statistics: {channel_id: channelCategory}
+    pending_statistics = {}
+    if checkpoint is not None and statistics:
+        pending_statistics = {
+            channel_id: checkpoint.done[channel_id].get("category")
+            for channel_id in all_channel_ids
+            if checkpoint.is_done(channel_id) and not checkpoint.done[channel_id].get("statistics", True)
+        }
+
+    # One pooled transport for all workers, so connections, rate limit, quota and keys are shared
+    quota = quota or QuotaScheduler()
+    transport = YTTransport(max_connections=workers, rate_limiter=RateLimiter(requests_per_second), quota=quota,
+                            key_pool=APIKeyPool(api_keys), cache=cache, metrics=metrics)
+    succeeded = {}
+    failed = {}
+    quota_exhausted = False
+    # channelCategory of every crawled channel, for the bulk statistics at the end
+    categories = {} if statistics else None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(crawl_channel, api_key, channel_id, directory,
+                            transport=transport,
+                            statistics=statistics,
+                            incremental=incremental,
+                            output_format=output_format,
+                            compression=compression,
+                            compact_records=compact_records,
+                            text_fields=text_fields,
+                            categories=categories): channel_id
+            for channel_id in channel_ids
+        }
+        with tqdm(total=len(futures), desc="Crawling channels", unit="channel") as pbar:
+            for future in as_completed(futures):
+                channel_id = futures[future]
+                try:
+                    succeeded[channel_id] = future.result()
+                    if checkpoint is not None and statistics:
+                        # Statistics still to dump, flipped to True once they are
+                        checkpoint.mark_done(channel_id, videos=succeeded[channel_id],
+                                             category=categories.get(channel_id), statistics=False)
+                    elif checkpoint is not None:
+                        checkpoint.mark_done(channel_id, videos=succeeded[channel_id])
+                except CancelledError:
+                    failed[channel_id] = "cancelled, quota exhausted"
+                except QuotaExceeded as e:
+                    failed[channel_id] = str(e)
+                    if not quota_exhausted:
+                        quota_exhausted = True
+                        print(f"Quota exhausted, stopping the remaining channels: {e}")
+                        for pending in futures:
+                            pending.cancel()
+                except Exception as e:
+                    failed[channel_id] = str(e)
+                    print(f"Error crawling channel {channel_id}: {e}")
+                pbar.update(1)
+                pbar.set_postfix(videos=sum(succeeded.values()), failed=len(failed))
+
+    print(f"Crawled {len(succeeded)} channels ({sum(succeeded.values())} videos), {len(failed)} failed")
+    if statistics and (succeeded or pending_statistics) and not quota_exhausted:
+        categories.update({channel_id: category for channel_id, category in pending_statistics.items() if category})
+        try:
+            dumped = dump_channel_statistics(api_key, list(succeeded) + list(pending_statistics), directory,
+                                             transport, categories)
+        except QuotaExceeded as e:
+            print(f"Quota exhausted while fetching the channel statistics: {e}")
+            dumped = {}
+        if checkpoint is not None:
+            for channel_id in dumped:
+                checkpoint.mark_done(channel_id, **dict(checkpoint.done.get(channel_id, {}), statistics=True))
+    if checkpoint is not None and all(
+        checkpoint.is_done(channel_id) and checkpoint.done[channel_id].get("statistics", True)
+        for channel_id in all_channel_ids
+    ):
+        # Every channel is done, the next run starts from scratch
+        checkpoint.clear()
+    print(f"Quota usage: {quota.summary()}")
+    return succeeded, failed
+
+
+def dump_channel_statistics(api_key, channel_ids, directory=None, transport=None, categories=None):
+
+    '''
+    Fetch the statistics of all the channels in bulk (50 per request) and dump
+    one channel_info file per channel, like YTStatsProMax.extract_channel_statistics.
+    categories is {channel_id: channelCategory} from the crawled videos, channels missing
+    from it (e.g. --statistics_only) are dumped with a null channelCategory, no videos are crawled for it.
+    '''
+
+    categories = categories or {}
+    statistics = get_bulk_channel_statistics(api_key, channel_ids, transport)
+    for channel_id, channel_statistics in statistics.items():
+        channel_statistics['channelCategory'] = categories.get(channel_id, channel_statistics['channelCategory'])
+        yt = YTStatsProMax(api_key, channel_id, transport=transport, show_progress=False)
+        yt.channel_statistics = channel_statistics
+        yt.dump_channel_statistics(directory=directory)
+    print(f"Dumped the statistics of {len(statistics)} channels")
+    return statistics
+
+
+def load_channel_ids(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--key_path", help="Path to the file containing the API keys, one per line", default="api_key.txt")
+    parser.add_argument("--channel_id_path", help="Path to the file containing the list of channel ids", default="channel_ids.txt")
+    parser.add_argument("--output_dir", help="Path to save the outputted files", default="sample_youtube_statistics")
+    parser.add_argument("--workers", help="Number of channels crawled concurrently", type=int, default=8)
+    parser.add_argument("--rate", help="Maximum API requests per second over all workers", type=float, default=10)
+    parser.add_argument("--statistics", help="Also dump the channel statistics", action="store_true")
+    parser.add_argument("--statistics_only", help="Only dump the channel statistics (50 channels per request), no videos", action="store_true")
+    parser.add_argument("--daily_quota", help="Daily quota units available for each API key", type=int, default=10000)
+    parser.add_argument("--units_per_second", help="Spread the quota units, at most this many per second", type=float, default=None)
+    parser.add_argument("--cache_path", help="SQLite file used to cache API responses between runs", default=None)
+    parser.add_argument("--incremental", help="Only hydrate new videos, refresh statistics of the ones in the previous dumps", action="store_true")
+    parser.add_argument("--output_format", help="json (indented dump), ndjson (streamed, one record per line) or parquet (partitioned columns)", choices=["json", "ndjson", "parquet"], default="json")
+    parser.add_argument("--compression", help="Compression of the ndjson files", choices=["gzip", "zstd"], default=None)
+    parser.add_argument("--compact_records", help="Keep the videos in memory as compact records instead of dicts", action="store_true")
+    parser.add_argument("--text_fields", help="keep, drop or compress (in memory) the description and tags", choices=TEXT_MODES, default="keep")
+    parser.add_argument("--checkpoint", help="Journal file to resume an interrupted run from", default=None)
+    parser.add_argument("--metrics_json", help="Write the request/stage metrics of the run to this JSON file", default=None)
+    parser.add_argument("--metrics_prom", help="Write the metrics in the Prometheus text format to this file", default=None)
+
+    args = parser.parse_args()
+
+    api_keys = load_api_keys(args.key_path)
+    channel_ids = load_channel_ids(args.channel_id_path)
+    quota = QuotaScheduler(args.daily_quota, args.units_per_second)
+    cache = ResponseCache(args.cache_path) if args.cache_path else None
+    metrics = get_metrics()
+    if args.statistics_only:
+        transport = YTTransport(rate_limiter=RateLimiter(args.rate), quota=quota, key_pool=APIKeyPool(api_keys), cache=cache,
+                                metrics=metrics)
+        dump_channel_statistics(api_keys[0], channel_ids, args.output_dir, transport)
+        print(f"Quota usage: {quota.summary()}")
+    else:
+        crawl_channels(api_keys, channel_ids, args.output_dir,
+                       workers=args.workers,
+                       requests_per_second=args.rate,
+                       statistics=args.statistics,
+                       quota=quota,
+                       cache=cache,
+                       incremental=args.incremental,
+                       output_format=args.output_format,
+                       compression=args.compression,
+                       compact_records=args.compact_records,
+                       text_fields=args.text_fields,
+                       checkpoint=CheckpointJournal(args.checkpoint) if args.checkpoint else None,
+                       metrics=metrics)
+    metrics.export(args.metrics_json, args.metrics_prom)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+from yt_records import json_default
+
+
+class CheckpointJournal:
+
+    '''
+    Append-only journal of a long crawl, one JSON line per event, fsynced as it is written:
+    - {"task": "US", "page": [next_page_token, {video_id: record}]} for every page crawled
+    - {"task": "US", "done": {...}} once a region/channel is completely written out
+    A restarted run replays the journal: finished tasks are skipped, unfinished ones get
+    their crawled pages back and continue from the saved page token, so no quota is
+    spent twice. A cut off last line (crash while writing) is ignored.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        self.in_flight = {}
+        self._replay()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                task = event["task"]
+                if "done" in event:
+                    self.done[task] = event["done"]
+                    self.in_flight.pop(task, None)
+                elif "page" in event and task not in self.done:
+                    self.in_flight.setdefault(task, []).append(event["page"])
+        if self.done or self.in_flight:
+            print(f"Resuming from {self.path}: {len(self.done)} finished, {len(self.in_flight)} in progress")
+        self._compact()
+
+    def _compact(self):
+        # Rewrite the journal without the pages of finished tasks (and without a broken last line)
+        with open(self.path + ".part", "w", encoding="utf-8") as f:
+            for task, info in self.done.items():
+                f.write(json.dumps({"task": task, "done": info}, ensure_ascii=False) + "\n")
+            for task, pages in self.in_flight.items():
+                for page in pages:
+                    f.write(json.dumps({"task": task, "page": page}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".part", self.path)
+
+    def _append(self, event):
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def is_done(self, task):
+        return task in self.done
+
+    def pages(self, task):
+
+        '''
+        {video_id: record} pages already crawled for an unfinished task, in order
+        '''
+
+        return [videos for _, videos in self.in_flight.get(task, [])]
+
+    def resume_token(self, task):
+
+        '''
+        Page token to continue the task from: "" to start from the beginning,
+        None when every page was already crawled
+        '''
+
+        pages = self.in_flight.get(task)
+        if not pages:
+            return ""
+        return pages[-1][0]
+
+    def record_page(self, task, next_page_token, videos):
+        self._append({"task": task, "page": [next_page_token, videos]})
+
+    def mark_done(self, task, **info):
+        self._append({"task": task, "done": info})
+        with self.lock:
+            self.done[task] = info
+            self.in_flight.pop(task, None)
+
+    def clear(self):
+
+        '''
+        Everything finished, the next run starts from scratch
+        '''
+
+        with self.lock:
+            self.file.close()
+            self.done = {}
+            self.in_flight = {}
+            self.file = open(self.path, "w", encoding="utf-8")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,168 @@
+import json
+import os
+from datetime import datetime, timezone
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet output needs the pyarrow package (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def video_schema():
+
+    '''
+    Explicit column types of a video record (trending and channel datasets share them,
+    columns a dataset doesn't have are just left out)
+    '''
+
+    pa, _ = _require_pyarrow()
+    return {
+        "videoId": pa.string(),
+        "fetchedDate": pa.timestamp("s", tz="UTC"),
+        "publishedAt": pa.timestamp("s", tz="UTC"),
+        "elapsedDays": pa.float64(),
+        "title": pa.string(),
+        "description": pa.string(),
+        "channelTitle": pa.string(),
+        "channelId": pa.string(),
+        "tags": pa.list_(pa.string()),
+        "category": pa.dictionary(pa.int16(), pa.string()),
+        "duration": pa.string(),
+        "durationSeconds": pa.int64(),
+        "isShort": pa.bool_(),
+        "licensedContent": pa.bool_(),
+        "viewCount": pa.int64(),
+        "avgDailyViews": pa.float64(),
+        "likeCount": pa.int64(),
+        "commentCount": pa.int64(),
+        "engagementRate": pa.float64(),
+        "topicCategories": pa.list_(pa.string()),
+    }
+
+
+def records_to_table(videos):
+
+    '''
+    Convert {video_id: record} (what the scrapers build) into a typed Arrow table
+    '''
+
+    pa, _ = _require_pyarrow()
+    schema = video_schema()
+
+    names = ["videoId"]
+    for record in videos.values():
+        for name in record:
+            if name not in names:
+                names.append(name)
+    # Known columns in schema order, anything new at the end
+    names = [name for name in schema if name in names] + [name for name in names if name not in schema]
+
+    columns = {"videoId": pa.array(list(videos.keys()), pa.string())}
+    for name in names[1:]:
+        values = [record.get(name) for record in videos.values()]
+        dtype = schema.get(name)
+        if dtype is None:
+            columns[name] = pa.array(values)
+        elif pa.types.is_timestamp(dtype):
+            columns[name] = pa.array(values, pa.string()).cast(dtype)
+        elif pa.types.is_dictionary(dtype):
+            columns[name] = pa.array(values, pa.string()).dictionary_encode().cast(dtype)
+        else:
+            columns[name] = pa.array(values, dtype)
+    return pa.table(columns)
+
+
+def partition_path(root, partitions):
+    # Hive style directories (fetchDate=2024-12-07/region=US), understood by pyarrow and pandas
+    parts = [f"{key}={value}" for key, value in partitions.items()]
+    return os.path.join(root, *parts)
+
+
+def write_parquet(videos, root, name, partitions=None, fetch_date=None):
+
+    '''
+    Write {video_id: record} as one Parquet file under root,
+    partitioned by fetch date (fetchDate=YYYY-MM-DD) and the given partitions
+    (e.g. {"region": "US"}). Returns the file path.
+    '''
+
+    _, pq = _require_pyarrow()
+    fetch_date = fetch_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    directory = partition_path(root, {"fetchDate": fetch_date, **(partitions or {})})
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, f"{name}.parquet")
+    tmp_path = path + ".part"
+    pq.write_table(records_to_table(videos), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_parquet_records(path):
+
+    '''
+    Read a Parquet file written by write_parquet back into {video_id: record}
+    with the same plain values the scrapers build (timestamps as "...Z" strings,
+    lists as lists), e.g. to refresh a previous dump. Partition columns are left out.
+    '''
+
+    _, pq = _require_pyarrow()
+    table = pq.read_table(path, partitioning=None)
+    videos = {}
+    for row in table.to_pylist():
+        video_id = row.pop("videoId")
+        for name, value in row.items():
+            if isinstance(value, datetime):
+                row[name] = value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        videos[video_id] = row
+    return videos
+
+
+def load_dataset(path, columns=None, filters=None):
+
+    '''
+    Load a video dataset as a DataFrame indexed by video id, whatever its format:
+    - indented .json dump ({video_id: record})
+    - .ndjson / .ndjson.gz / .ndjson.zst (yt_writers.NDJSONWriter)
+    - a .parquet file or a partitioned Parquet directory; only `columns` are read
+      and `filters` (pyarrow filters, e.g. [("region", "=", "US")]) prune partitions
+    '''
+
+    import pandas as pd
+
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        _require_pyarrow()
+        read_columns = None if columns is None else list(dict.fromkeys(["videoId", *columns]))
+        df = pd.read_parquet(path, columns=read_columns, filters=filters)
+        return df.set_index("videoId")
+
+    if ".ndjson" in os.path.basename(path):
+        from yt_writers import read_ndjson
+        data = read_ndjson(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    df = pd.DataFrame.from_dict(data, orient="index")
+    df.index.name = "videoId"
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+    return df
+
+
+def save_dataset(df, path):
+
+    '''
+    Save a DataFrame indexed by video id as .parquet or as an indented .json dump
+    '''
+
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        df.reset_index(names="videoId").to_parquet(path, index=False, compression="zstd")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(df.to_json(orient="index", force_ascii=False, indent=4))
@@ -0,0 +1,171 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# ISO 8601 durations as YouTube returns them (P#DT#H#M#S, P#W for very long streams)
+DURATION_RE = re.compile(r"^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+DURATION_UNITS = (7 * 86400, 86400, 3600, 60, 1)
+
+# Shorts can be up to 3 minutes long
+SHORTS_MAX_SECONDS = 180
+
+
+@lru_cache(maxsize=16)
+def _recorded_time(recorded_utc_time):
+    # RECORDED_UTC_TIME is the same for a whole run, parse it once
+    return pd.Timestamp(recorded_utc_time).tz_convert("UTC")
+
+
+def compute_features(published_at, view_count, like_count=None, comment_count=None, duration=None,
+                     category_id=None, recorded_utc_time=None, category_mapping=None):
+
+    '''
+    Compute the derived video columns for many videos in one pass.
+    Every argument is a sequence with one value per video (recorded_utc_time can also be
+    a single timestamp for all of them), returns a DataFrame with
+    elapsedDays, avgDailyViews, engagementRate, durationSeconds, isShort and category
+    (only the columns whose inputs were given).
+    Rounding matches the per-video calculate_* methods of the scrapers
+    (up to the last decimal on exact half-way values).
+    '''
+
+    published = pd.to_datetime(pd.Series(published_at, dtype="object"), format=TIME_FORMAT, utc=True)
+    if recorded_utc_time is None:
+        recorded = pd.Timestamp.now(tz="UTC").floor("s")
+    elif isinstance(recorded_utc_time, str):
+        recorded = _recorded_time(recorded_utc_time)
+    else:
+        # One recorded time per video (e.g. the fetchedDate column of a dataset)
+        recorded = pd.to_datetime(pd.Series(recorded_utc_time, dtype="object"), format=TIME_FORMAT, utc=True)
+
+    elapsed_days = ((recorded - published).dt.total_seconds() / SECONDS_PER_DAY).to_numpy(dtype="float64")
+    elapsed_days = np.round(elapsed_days, 4)
+    views = np.asarray(pd.to_numeric(pd.Series(view_count), errors="coerce").fillna(0), dtype="int64")
+
+    # avgDailyViews divides by the already rounded elapsedDays, like the string version did
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_daily_views = np.where(elapsed_days > 0, views / elapsed_days, 0.0)
+    features = {
+        "elapsedDays": elapsed_days,
+        "viewCount": views,
+        "avgDailyViews": np.round(avg_daily_views, 2),
+    }
+
+    if like_count is not None and comment_count is not None:
+        likes = np.asarray(pd.to_numeric(pd.Series(like_count), errors="coerce").fillna(0), dtype="int64")
+        comments = np.asarray(pd.to_numeric(pd.Series(comment_count), errors="coerce").fillna(0), dtype="int64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            engagement_rate = np.where(views > 0, (likes + comments) / views, 0.0)
+        features["likeCount"] = likes
+        features["commentCount"] = comments
+        features["engagementRate"] = np.round(engagement_rate, 4)
+
+    if duration is not None:
+        features["durationSeconds"] = duration_seconds(duration)
+        features["isShort"] = is_short(features["durationSeconds"])
+
+    if category_id is not None:
+        mapping = category_mapping or {}
+        features["category"] = pd.Series(category_id, dtype="object").map(mapping).fillna("Unknown").to_numpy()
+
+    return pd.DataFrame(features)
+
+
+@lru_cache(maxsize=65536)
+def parse_duration_seconds(duration):
+
+    '''
+    ISO 8601 duration (PT1H2M3S) -> integer seconds, 0 when missing or unparsable.
+    Cached, the same few thousand durations come back over and over.
+    '''
+
+    if not duration:
+        return 0
+    match = DURATION_RE.match(duration)
+    if not match:
+        return 0
+    return sum(int(value) * unit for value, unit in zip(match.groups(), DURATION_UNITS) if value)
+
+
+def duration_seconds(durations):
+
+    '''
+    Vectorized parse_duration_seconds for a column of durations:
+    every distinct value is parsed once and the results are broadcast back
+    '''
+
+    codes, uniques = pd.factorize(pd.Series(durations, dtype="object"))
+    parsed = np.fromiter((parse_duration_seconds(value) for value in uniques), dtype="int64", count=len(uniques))
+    # factorize gives -1 to missing values, they get 0 seconds
+    parsed = np.append(parsed, 0)
+    return parsed[codes]
+
+
+def is_short(seconds):
+    # Vectorized too, works on a single value or on a durationSeconds column
+    seconds = np.asarray(seconds)
+    return (seconds > 0) & (seconds <= SHORTS_MAX_SECONDS)
+
+
+def page_features(items, recorded_utc_time, category_mapping):
+
+    '''
+    Features for a page of raw videos.list items, indexed by video id
+    (items must already have their snippet/statistics/contentDetails parts)
+    '''
+
+    if not items:
+        return pd.DataFrame()
+
+    snippets = [item["snippet"] for item in items]
+    statistics = [item["statistics"] for item in items]
+    features = compute_features(
+        published_at=[snippet.get("publishedAt") for snippet in snippets],
+        view_count=[stats.get("viewCount", 0) for stats in statistics],
+        like_count=[stats.get("likeCount", 0) for stats in statistics],
+        comment_count=[stats.get("commentCount", 0) for stats in statistics],
+        duration=[item["contentDetails"].get("duration", "") for item in items],
+        category_id=[snippet.get("categoryId", "N/A") for snippet in snippets],
+        recorded_utc_time=recorded_utc_time,
+        category_mapping=category_mapping,
+    )
+    features.index = [item.get("id", "") for item in items]
+    return features
+
+
+def dataset_features(df, recorded_utc_time=None):
+
+    '''
+    Recompute the derived columns of a whole dataset DataFrame (e.g. from
+    yt_columnar.load_dataset). Each row is measured at its own fetchedDate
+    unless recorded_utc_time is given. Returns a new DataFrame.
+    '''
+
+    published = df["publishedAt"]
+    if pd.api.types.is_datetime64_any_dtype(published):
+        published = published.dt.strftime(TIME_FORMAT)
+    if recorded_utc_time is None and "fetchedDate" in df:
+        fetched = df["fetchedDate"]
+        if pd.api.types.is_datetime64_any_dtype(fetched):
+            fetched = fetched.dt.strftime(TIME_FORMAT)
+        recorded_utc_time = fetched.to_numpy()
+
+    features = compute_features(
+        published_at=published.to_numpy(),
+        view_count=df["viewCount"].to_numpy(),
+        like_count=df["likeCount"].to_numpy() if "likeCount" in df else None,
+        comment_count=df["commentCount"].to_numpy() if "commentCount" in df else None,
+        duration=df["duration"].to_numpy() if "duration" in df else None,
+        recorded_utc_time=recorded_utc_time,
+    )
+    features.index = df.index
+    result = df.copy()
+    for column in features.columns:
+        result[column] = features[column]
+    return result
@@ -0,0 +1,124 @@
+import json
+import re
+
+from yt_writers import iter_ndjson, open_text
+
+
+WHITESPACE = re.compile(r"\s*")
+
+
+class _StreamReader:
+
+    '''
+    Chunked reader that hands complete JSON values to json.JSONDecoder.raw_decode,
+    only the unread part of the file (one chunk + the current value) is kept in memory
+    '''
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.more():
+                    raise
+                continue
+            # A number at the very end of the buffer may be cut in half, read on to be sure
+            if end == len(self.buf) and not self.eof and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_object(path, chunk_size=1 << 16):
+
+    '''
+    Incrementally yield (key, value) from a file holding one big JSON object,
+    like our {video_id: record} dumps, without loading the whole file
+    '''
+
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _StreamReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            yield key, reader.value()
+
+            separator = reader.peek()
+            if separator == "}":
+                return
+            reader.expect(",")
+
+
+def iter_records(path):
+
+    '''
+    Yield (video_id, record) from a dump in any of our text formats
+    (indented .json or .ndjson[.gz|.zst])
+    '''
+
+    if ".ndjson" in path:
+        return iter_ndjson(path)
+    return iter_json_object(path)
+
+
+def iter_string_fields(path, fields, chunk_size=1 << 16):
+
+    '''
+    Yield (field, value) for every `"field": "string"` pair of the given fields,
+    in file order, without decoding the records around them (works on indented
+    .json and on .ndjson[.gz|.zst]). Keys quoted inside other strings are escaped
+    (\\"channelId\\") so they never match.
+    '''
+
+    names = "|".join(re.escape(field) for field in fields)
+    pattern = re.compile(r'"(' + names + r')"\s*:\s*"((?:[^"\\]|\\.){0,256})"')
+    # Enough of the previous chunk to finish a pair cut in half
+    overlap = max(len(field) for field in fields) + 300
+
+    with open_text(path) as f:
+        buf = ""
+        while True:
+            chunk = f.read(chunk_size)
+            buf += chunk
+            end = 0
+            for match in pattern.finditer(buf):
+                yield match.group(1), json.loads('"' + match.group(2) + '"')
+                end = match.end()
+            if not chunk:
+                return
+            buf = buf[max(end, len(buf) - overlap):]
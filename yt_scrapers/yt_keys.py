@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, time, timedelta
+
+from yt_quota import PACIFIC, QuotaExceeded
+
+
+def load_api_keys(path):
+
+    '''
+    Read API keys from a file, one per line.
+    Blank lines and lines starting with # are ignored,
+    so the old single key api_key.txt still works.
+    '''
+
+    with open(path, 'r') as f:
+        keys = [line.strip() for line in f]
+    return [key for key in keys if key and not key.startswith('#')]
+
+
+def next_quota_reset():
+    # The daily quota of every key resets at midnight Pacific time
+    tomorrow = datetime.now(PACIFIC).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, time(0, 0), tzinfo=PACIFIC)
+
+
+class APIKeyPool:
+
+    '''
+    Round-robin pool of API keys shared by every request of a crawl.
+    A key that hits its quota is retired until the next quota reset
+    and re-admitted automatically after that.
+    '''
+
+    def __init__(self, keys):
+        if not keys:
+            raise ValueError("APIKeyPool needs at least one API key")
+        self.keys = list(dict.fromkeys(keys))
+        self.retired = {}
+        self.index = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+
+        '''
+        Return the next usable key, raises QuotaExceeded when all of them are retired
+        '''
+
+        with self.lock:
+            self._readmit()
+            for _ in range(len(self.keys)):
+                key = self.keys[self.index % len(self.keys)]
+                self.index += 1
+                if key not in self.retired:
+                    return key
+        raise QuotaExceeded(f"All {len(self.keys)} API keys are out of quota until {min(self.retired.values())}")
+
+    def retire(self, key, until=None):
+        with self.lock:
+            if key in self.keys and key not in self.retired:
+                self.retired[key] = until or next_quota_reset()
+                print(f"API key {key[:6]}... retired until {self.retired[key]}")
+
+    def _readmit(self):
+        now = datetime.now(PACIFIC)
+        for key, until in list(self.retired.items()):
+            if until <= now:
+                del self.retired[key]
+
+    def available(self):
+        with self.lock:
+            self._readmit()
+            return len(self.keys) - len(self.retired)
@@ -0,0 +1,176 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class TrendingLabeler:
+
+    '''
+    Labels videos against the trending dataset (the README to-do):
+    - trendingScore: mean percentile of avgDailyViews, viewCount and likeCount
+      among the trending videos (what 0_data_trend_explore.py computed with rank(pct=True))
+    - isTrending: 1 if the score reaches the lowest score of the trending videos
+    - trendingPercentile: the 10 equal width bins of pd.cut(score, 10) fitted on the
+      trending videos (0.05 ... 0.95), None below them
+
+    fit() keeps the sorted trending values and the bin edges, save()/load() persist them,
+    so any number of channel videos can then be labeled chunk by chunk with
+    np.searchsorted (O(log k) per value, k = number of trending videos).
+    '''
+
+    FEATURES = ("avgDailyViews", "viewCount", "likeCount")
+    LABELS = (0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95)
+
+    def __init__(self, features=FEATURES, labels=LABELS):
+        self.features = list(features)
+        self.labels = list(labels)
+        self.values = {}
+        self.edges = None
+
+    def fit(self, trending_df):
+        for feature in self.features:
+            values = pd.to_numeric(trending_df[feature], errors="coerce").dropna()
+            self.values[feature] = np.sort(values.to_numpy(dtype="float64"))
+
+        scores = self.score(trending_df)
+        # Same bins as pd.cut(scores, len(labels), include_lowest=True)
+        low, high = np.nanmin(scores), np.nanmax(scores)
+        edges = np.linspace(low, high, len(self.labels) + 1)
+        edges[0] -= (high - low) * 0.001 if high > low else 0.001
+        self.edges = edges
+        return self
+
+    def score(self, df):
+
+        '''
+        Mean percentile rank of each row among the trending values,
+        equal to rank(pct=True) (ties averaged) for the trending videos themselves
+        '''
+
+        total = np.zeros(len(df))
+        for feature in self.features:
+            reference = self.values[feature]
+            values = pd.to_numeric(df[feature], errors="coerce").fillna(0).to_numpy(dtype="float64")
+            below = np.searchsorted(reference, values, side="left")
+            below_or_equal = np.searchsorted(reference, values, side="right")
+            total += (below + below_or_equal + 1) / 2 / len(reference)
+        return total / len(self.features)
+
+    def label(self, df):
+
+        '''
+        Return a copy of df with trendingScore, isTrending and trendingPercentile
+        '''
+
+        if self.edges is None:
+            raise ValueError("TrendingLabeler is not fitted, call fit() or load() first")
+
+        scores = self.score(df)
+        # Bins are closed on the right like pd.cut, anything above the top one is in the top one
+        bins = np.searchsorted(self.edges, scores, side="left") - 1
+        is_trending = bins >= 0
+        percentiles = np.asarray(self.labels, dtype="float64")[np.clip(bins, 0, len(self.labels) - 1)]
+
+        result = df.copy()
+        result["trendingScore"] = scores
+        result["isTrending"] = is_trending.astype("int8")
+        result["trendingPercentile"] = np.where(is_trending, percentiles, np.nan)
+        return result
+
+    def label_chunks(self, chunks):
+        # Label an iterable of DataFrames lazily, one chunk in memory at a time
+        for chunk in chunks:
+            yield self.label(chunk)
+
+    def save(self, path):
+        state = {
+            "features": self.features,
+            "labels": self.labels,
+            "values": {feature: values.tolist() for feature, values in self.values.items()},
+            "edges": self.edges.tolist(),
+        }
+        with open(path + ".part", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        labeler = cls(state["features"], state["labels"])
+        labeler.values = {feature: np.asarray(values, dtype="float64") for feature, values in state["values"].items()}
+        labeler.edges = np.asarray(state["edges"], dtype="float64")
+        return labeler
+
+
+def iter_dataset_chunks(path, chunk_size=100000):
+
+    '''
+    Read a video dataset as DataFrames of at most chunk_size rows (indexed by video id):
+    .json / .ndjson[.gz|.zst] dumps are streamed record by record,
+    Parquet files/directories batch by batch
+    '''
+
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        from yt_columnar import _require_pyarrow
+        _require_pyarrow()
+        import pyarrow.dataset as ds
+        for batch in ds.dataset(path, format="parquet", partitioning="hive").to_batches(batch_size=chunk_size):
+            yield batch.to_pandas().set_index("videoId")
+        return
+
+    from yt_jsonstream import iter_records
+    records = {}
+    for video_id, record in iter_records(path):
+        records[video_id] = record
+        if len(records) >= chunk_size:
+            yield _records_frame(records)
+            records = {}
+    if records:
+        yield _records_frame(records)
+
+
+def _records_frame(records):
+    df = pd.DataFrame.from_dict(records, orient="index")
+    df.index.name = "videoId"
+    return df
+
+
+def label_dataset(labeler, input_path, output_path, chunk_size=100000, compression=None):
+
+    '''
+    Stream a (possibly huge) channel dataset through the labeler into output_path,
+    .parquet output is written batch by batch, anything else as NDJSON
+    (yt_writers.NDJSONWriter). Returns the number of labeled videos.
+    '''
+
+    chunks = labeler.label_chunks(iter_dataset_chunks(input_path, chunk_size))
+    count = 0
+
+    if output_path.endswith(".parquet"):
+        from yt_columnar import _require_pyarrow
+        pa, pq = _require_pyarrow()
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk.reset_index(names="videoId"), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path + ".part", table.schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+                count += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is not None:
+            os.replace(output_path + ".part", output_path)
+        return count
+
+    from yt_writers import NDJSONWriter
+    with NDJSONWriter(output_path, compression) as writer:
+        for chunk in chunks:
+            records = json.loads(chunk.to_json(orient="index", force_ascii=False, double_precision=15))
+            writer.write_many(records)
+            count += len(records)
+    return count
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CrawlMetrics:
+
+    '''
+    Counters of a crawl, shared by every thread using the same transport:
+    - per endpoint: requests, errors, latency (histogram), bytes, retries,
+      quota units and cache hits / revalidations (recorded by YTTransport.get)
+    - per stage: calls and time spent, e.g. network, json_decode, features,
+      serialization (timed with `with metrics.stage("features"):`)
+    Exported with summary() / to_json() or as Prometheus text with to_prometheus().
+    '''
+
+    # Upper bounds (seconds) of the request latency histogram
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = {}
+            self.stages = {}
+
+    def record_request(self, endpoint, seconds, nbytes=0, status=None, retries=0, units=0, cache=None):
+
+        '''
+        One YTTransport.get call: total seconds (retries and backoff included),
+        final status (None for a network error), cache "hit", "revalidated" or None
+        '''
+
+        with self.lock:
+            stats = self.requests.get(endpoint)
+            if stats is None:
+                stats = self.requests[endpoint] = {
+                    "count": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0,
+                    "retries": 0, "units": 0, "cache_hits": 0, "revalidated": 0,
+                    "buckets": [0] * len(self.LATENCY_BUCKETS),
+                }
+            stats["count"] += 1
+            stats["errors"] += status != 200
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["bytes"] += nbytes
+            stats["retries"] += retries
+            stats["units"] += units
+            stats["cache_hits"] += cache == "hit"
+            stats["revalidated"] += cache == "revalidated"
+            for index, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][index] += 1
+                    break
+
+    def add_stage(self, name, seconds, count=1):
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+            stats["count"] += count
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def summary(self):
+        with self.lock:
+            requests = {}
+            for endpoint, stats in self.requests.items():
+                requests[endpoint] = {name: value for name, value in stats.items() if name != "buckets"}
+                requests[endpoint]["avg_seconds"] = stats["seconds"] / stats["count"]
+                requests[endpoint]["latency_buckets"] = dict(zip(map(str, self.LATENCY_BUCKETS), stats["buckets"]))
+            return {
+                "elapsed_seconds": time.time() - self.started,
+                "requests": requests,
+                "stages": {name: dict(stats) for name, stats in self.stages.items()},
+            }
+
+    def to_json(self, path=None):
+        text = json.dumps(self.summary(), indent=4)
+        if path:
+            _write_text(path, text)
+        return text
+
+    def to_prometheus(self, path=None, prefix="yt"):
+
+        '''
+        Prometheus text exposition format (for a textfile collector or a push gateway)
+        '''
+
+        summary = self.summary()
+        with self.lock:
+            buckets = {endpoint: list(stats["buckets"]) for endpoint, stats in self.requests.items()}
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+
+        requests = summary["requests"]
+        for name, field, help_text in (
+            ("requests_total", "count", "API requests"),
+            ("request_errors_total", "errors", "API requests not ending in a 200"),
+            ("request_bytes_total", "bytes", "Response bytes"),
+            ("request_retries_total", "retries", "Retried attempts"),
+            ("quota_units_total", "units", "Quota units charged"),
+            ("cache_hits_total", "cache_hits", "Requests served from the response cache"),
+            ("cache_revalidated_total", "revalidated", "Requests answered 304 Not Modified"),
+        ):
+            metric(name, "counter", help_text,
+                   [({"endpoint": endpoint}, stats[field]) for endpoint, stats in requests.items()])
+
+        samples = []
+        for endpoint, stats in requests.items():
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, buckets[endpoint]):
+                cumulative += count
+                samples.append(({"endpoint": endpoint, "le": bound}, cumulative))
+            samples.append(({"endpoint": endpoint, "le": "+Inf"}, stats["count"]))
+        lines.append(f"# HELP {prefix}_request_duration_seconds Request latency, retries included")
+        lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+        for labels, value in samples:
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{labels["endpoint"]}",le="{labels["le"]}"}} {value}')
+        for endpoint, stats in requests.items():
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats["seconds"]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats["count"]}')
+
+        stages = summary["stages"]
+        metric("stage_seconds_total", "counter", "Time spent per crawl stage",
+               [({"stage": name}, stats["seconds"]) for name, stats in stages.items()])
+        metric("stage_calls_total", "counter", "Timed calls per crawl stage",
+               [({"stage": name}, stats["count"]) for name, stats in stages.items()])
+
+        text = "\n".join(lines) + "\n"
+        if path:
+            _write_text(path, text)
+        return text
+
+    def report(self):
+        # Short human readable version, one line per endpoint and stage
+        summary = self.summary()
+        lines = [f"Crawl metrics after {summary['elapsed_seconds']:.1f}s"]
+        for endpoint, stats in summary["requests"].items():
+            lines.append(
+                f"  {endpoint}: {stats['count']} requests, {stats['avg_seconds'] * 1000:.0f} ms avg, "
+                f"{stats['bytes'] / 1e6:.1f} MB, {stats['retries']} retries, {stats['units']} units, "
+                f"{stats['cache_hits']} cache hits"
+            )
+        for name, stats in sorted(summary["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"  {name}: {stats['seconds']:.2f}s over {stats['count']} calls")
+        return "\n".join(lines)
+
+    def export(self, json_path=None, prometheus_path=None):
+        # End of a CLI run: print the report and write the requested files
+        print(self.report())
+        if json_path:
+            self.to_json(json_path)
+            print(f"Metrics written to {json_path}")
+        if prometheus_path:
+            self.to_prometheus(prometheus_path)
+            print(f"Prometheus metrics written to {prometheus_path}")
+
+
+def _write_text(path, text):
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".part", path)
+
+
+_default_metrics = CrawlMetrics()
+
+
+def get_metrics():
+
+    '''
+    Metrics shared by every transport that is not given its own
+    '''
+
+    return _default_metrics
@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _limit_items(items, max_items, count):
+    # Cut the last page so that at most max_items items are yielded overall
+    if max_items is not None and count + len(items) > max_items:
+        return items[:max_items - count]
+    return items
+
+
+def iter_pages(fetch_page, max_pages=None, max_items=None, prefetch=True, page_token="", with_tokens=False):
+
+    '''
+    Lazily walk a paginated API listing, yields the items of each page.
+    fetch_page(page_token) returns the decoded response ({} or None on error,
+    the first call gets ""). With prefetch the next page is already being fetched
+    in the background while the caller works on the current one.
+    Stops after max_pages pages / max_items items, or as soon as the caller
+    stops iterating (breaking out of the loop doesn't fetch anything more,
+    an already started prefetch just finishes in the background).
+    page_token starts from a later page (e.g. a resumed crawl), with_tokens yields
+    (items, next_page_token) so the caller can save where it is (None after the last page).
+    '''
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch_page(page_token)
+        pages = 0
+        count = 0
+        while page:
+            pages += 1
+            next_page_token = page.get("nextPageToken")
+            more = next_page_token and (max_pages is None or pages < max_pages)
+
+            items = _limit_items(page.get("items", []), max_items, count)
+            count += len(items)
+            if max_items is not None and count >= max_items:
+                more = False
+
+            future = executor.submit(fetch_page, next_page_token) if more and executor else None
+            yield (items, next_page_token if more else None) if with_tokens else items
+
+            if not more:
+                return
+            page = future.result() if future else fetch_page(next_page_token)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_pages(fetch_page, max_pages=None, max_items=None, prefetch=True, page_token="", with_tokens=False):
+
+    '''
+    Async version of iter_pages, fetch_page stays a normal blocking function
+    and runs in a worker thread (asyncio.to_thread), so other coroutines
+    (writers, other crawls) keep running meanwhile
+    '''
+
+    page = await asyncio.to_thread(fetch_page, page_token)
+    pages = 0
+    count = 0
+    task = None
+    try:
+        while page:
+            pages += 1
+            next_page_token = page.get("nextPageToken")
+            more = next_page_token and (max_pages is None or pages < max_pages)
+
+            items = _limit_items(page.get("items", []), max_items, count)
+            count += len(items)
+            if max_items is not None and count >= max_items:
+                more = False
+
+            task = asyncio.create_task(asyncio.to_thread(fetch_page, next_page_token)) if more and prefetch else None
+            yield (items, next_page_token if more else None) if with_tokens else items
+
+            if not more:
+                return
+            page = await task if task else await asyncio.to_thread(fetch_page, next_page_token)
+            task = None
+    finally:
+        if task:
+            task.cancel()
@@ -0,0 +1,122 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database, fall back to PST (off by one hour during daylight saving)
+    PACIFIC = timezone(timedelta(hours=-8))
+
+
+class QuotaExceeded(Exception):
+    '''Raised when a request would go over the daily quota budget of its key'''
+
+
+class QuotaScheduler:
+
+    '''
+    Quota accounting for the YouTube Data API.
+    Every request is charged its endpoint cost (search.list = 100, most list calls = 1)
+    against the key it uses. The daily budget resets at midnight Pacific time like
+    the real quota, and an optional token bucket spreads the units over time.
+    '''
+
+    # https://developers.google.com/youtube/v3/determine_quota_cost
+    COSTS = {
+        "search": 100,
+        "videos": 1,
+        "playlistItems": 1,
+        "channels": 1,
+        "playlists": 1,
+        "commentThreads": 1,
+        "videoCategories": 1,
+    }
+    DEFAULT_COST = 1
+
+    def __init__(self, daily_budget=10000, units_per_second=None):
+        self.daily_budget = daily_budget
+        self.units_per_second = units_per_second
+        self.used = {}
+        self.day = self._quota_day()
+
+        # Token bucket, holds at most one second worth of units
+        self.tokens = units_per_second or 0
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _quota_day(self):
+        return datetime.now(PACIFIC).date()
+
+    def cost(self, url):
+
+        '''
+        Return (endpoint, units, key) of a request url
+        '''
+
+        parsed = urlparse(url)
+        endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+        key = parse_qs(parsed.query).get("key", [None])[0]
+        return endpoint, self.COSTS.get(endpoint, self.DEFAULT_COST), key
+
+    def acquire(self, url):
+
+        '''
+        Charge the request to its key, waiting for the token bucket if needed.
+        Raises QuotaExceeded instead of sending a request the API would reject.
+        '''
+
+        endpoint, units, key = self.cost(url)
+        with self.lock:
+            self._reset_if_new_day()
+            used = self.used.get(key, 0)
+            if used + units > self.daily_budget:
+                raise QuotaExceeded(f"{endpoint} needs {units} units, only {self.daily_budget - used} left today")
+            self.used[key] = used + units
+            wait_time = self._take_tokens(units)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return units
+
+    def _take_tokens(self, units):
+
+        '''
+        Take units from the bucket, it may go negative (a search call costs more
+        than one second worth of units), the caller then sleeps off the debt
+        '''
+
+        if not self.units_per_second:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.units_per_second, self.tokens + (now - self.last_refill) * self.units_per_second)
+        self.last_refill = now
+        self.tokens -= units
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.units_per_second
+
+    def _reset_if_new_day(self):
+        today = self._quota_day()
+        if today != self.day:
+            self.day = today
+            self.used = {}
+
+    def remaining(self, key):
+        with self.lock:
+            self._reset_if_new_day()
+            return self.daily_budget - self.used.get(key, 0)
+
+    def summary(self):
+
+        '''
+        Units used and left per key (keys are shortened so they are safe to print)
+        '''
+
+        with self.lock:
+            self._reset_if_new_day()
+            return {
+                f"{key[:6]}...": {"used": used, "remaining": self.daily_budget - used}
+                for key, used in self.used.items() if key
+            }
@@ -0,0 +1,105 @@
+import json
+import sys
+import zlib
+from collections.abc import Mapping
+
+
+# Every field a trending or channel video record can have, in dump order
+FIELDS = (
+    "fetchedDate", "publishedAt", "elapsedDays", "title", "description", "channelTitle", "channelId",
+    "tags", "category", "duration", "durationSeconds", "isShort", "licensedContent", "viewCount",
+    "avgDailyViews", "likeCount", "commentCount", "engagementRate", "topicCategories",
+)
+
+# Few distinct values shared by many videos, kept once in memory
+INTERNED_FIELDS = ("fetchedDate", "channelTitle", "channelId", "category", "duration")
+# Lists that become tuples, their (repetitive) items are interned too
+LIST_FIELDS = ("tags", "topicCategories")
+# Heavy text nobody reads until the dump
+TEXT_FIELDS = ("description", "tags")
+
+TEXT_MODES = ("keep", "drop", "compress")
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class VideoRecord(Mapping):
+
+    '''
+    Compact read-only video record, a drop-in for the {field: value} dicts of the scrapers
+    (json via json_default, NDJSONWriter, write_parquet and SnapshotStore all take it).
+    Fields live in __slots__ instead of a per-video dict, repeated strings are interned
+    and the text fields can be dropped or kept zlib-compressed until they are read
+    (text_fields "keep", "drop" or "compress").
+    '''
+
+    __slots__ = FIELDS + ("_compressed",)
+
+    def __init__(self, fields, text_fields="keep"):
+        if text_fields not in TEXT_MODES:
+            raise ValueError(f"Unknown text_fields {text_fields!r}, use one of {TEXT_MODES}")
+
+        compressed = ()
+        for name, value in fields.items():
+            if name in TEXT_FIELDS and text_fields == "drop":
+                continue
+            if name in LIST_FIELDS and value is not None:
+                value = tuple(_intern(item) for item in value)
+            elif name in INTERNED_FIELDS:
+                value = _intern(value)
+            if name in TEXT_FIELDS and text_fields == "compress":
+                value = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+                compressed += (name,)
+            # Unknown fields raise AttributeError, FIELDS lists everything the scrapers write
+            setattr(self, name, value)
+        self._compressed = compressed
+
+    def __getitem__(self, name):
+        if name not in FIELDS:
+            raise KeyError(name)
+        try:
+            value = getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+        if name in self._compressed:
+            # Decompressed on every read, nothing is cached back
+            value = json.loads(zlib.decompress(value))
+        return value
+
+    def __iter__(self):
+        for name in FIELDS:
+            if hasattr(self, name):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"VideoRecord({dict(self)!r})"
+
+    def to_dict(self):
+        return dict(self)
+
+
+def make_record(fields, compact=False, text_fields="keep"):
+
+    '''
+    The record the scrapers keep in memory: the plain dict by default,
+    a VideoRecord with compact=True (or whenever the text is compressed)
+    '''
+
+    if compact or text_fields == "compress":
+        return VideoRecord(fields, text_fields)
+    if text_fields == "drop":
+        for name in TEXT_FIELDS:
+            fields.pop(name, None)
+    return fields
+
+
+def json_default(value):
+    # json.dump(..., default=json_default) for dumps that may hold VideoRecords
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
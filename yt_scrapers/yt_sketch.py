@@ -0,0 +1,110 @@
+import math
+import random
+
+import numpy as np
+
+
+class KLLSketch:
+
+    '''
+    KLL streaming quantile sketch (Karnin, Lang, Liberty 2016).
+    Keeps O(k log(n/k)) values out of n, a level h value stands for 2^h original values.
+    When a level is full it is sorted and every other value (random offset) moves up a level.
+    Rank error is about 1.7/k of n (k=200: well under 1% for our cutoffs).
+    Sketches of different files/chunks can be merged, and saved with to_dict().
+    Up to exact_limit values nothing is compacted and quantile() is exact (same linear
+    interpolation as pandas), the approximation only kicks in for bigger inputs.
+    seed makes the compactions, so the approximate quantiles, repeatable.
+    '''
+
+    def __init__(self, k=200, c=2 / 3, seed=None, exact_limit=100000):
+        self.k = k
+        self.c = c
+        self.seed = seed
+        self.exact_limit = exact_limit
+        self.n = 0
+        self.levels = [[]]
+        self.random = random.Random(seed)
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _size(self):
+        return sum(len(values) for values in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value):
+        self.update_many([value])
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.levels[0].extend(values.tolist())
+        self.n += len(values)
+        self._compress()
+
+    def _compress(self):
+        if self.is_exact() and self.n <= self.exact_limit:
+            return
+        while self._size() > self._max_size():
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) > self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    values = sorted(self.levels[level])
+                    # An odd value out stays on its level so no weight is lost
+                    leftover = [values.pop()] if len(values) % 2 else []
+                    offset = self.random.random() < 0.5
+                    self.levels[level + 1].extend(values[offset::2])
+                    self.levels[level] = leftover
+                    break
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, values in enumerate(other.levels):
+            self.levels[level].extend(values)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+
+        '''
+        Value at quantile q (0..1), exact until exact_limit values, None for an empty sketch
+        '''
+
+        if not self.n:
+            return None
+        if self.is_exact():
+            return float(np.quantile(self.levels[0], q))
+        values = []
+        weights = []
+        for level, level_values in enumerate(self.levels):
+            values.extend(level_values)
+            weights.extend([2 ** level] * len(level_values))
+        order = np.argsort(values, kind="stable")
+        values = np.asarray(values)[order]
+        cumulative = np.cumsum(np.asarray(weights)[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[min(index, len(values) - 1)])
+
+    def to_dict(self):
+        return {"k": self.k, "c": self.c, "seed": self.seed, "exact_limit": self.exact_limit, "n": self.n,
+                "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, state):
+        # Sketches saved before seed / exact_limit existed were always compacted
+        sketch = cls(state["k"], state["c"], state.get("seed"), state.get("exact_limit", 0))
+        sketch.n = state["n"]
+        sketch.levels = [list(values) for values in state["levels"]]
+        return sketch
@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+
+
+class SnapshotStore:
+
+    '''
+    SQLite store of repeated trending crawls.
+    Static metadata (title, description, tags, ...) is kept once per video in `videos`,
+    every crawl only appends the changing counters and the rank to `snapshots`,
+    so the store grows with the number of (video, region, crawl) rows, not the payload.
+    '''
+
+    def __init__(self, path="yt_snapshots.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                channel_id TEXT,
+                channel_title TEXT,
+                title TEXT,
+                description TEXT,
+                tags TEXT,
+                category TEXT,
+                duration TEXT,
+                licensed_content INTEGER,
+                topic_categories TEXT,
+                published_at TEXT,
+                first_seen TEXT,
+                last_seen TEXT
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                video_id TEXT NOT NULL,
+                region TEXT NOT NULL,
+                fetched_date TEXT NOT NULL,
+                rank INTEGER,
+                view_count INTEGER,
+                like_count INTEGER,
+                comment_count INTEGER,
+                PRIMARY KEY (video_id, region, fetched_date)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_videos_channel ON videos (channel_id);
+            CREATE INDEX IF NOT EXISTS idx_snapshots_time ON snapshots (fetched_date);
+            CREATE INDEX IF NOT EXISTS idx_snapshots_region_time ON snapshots (region, fetched_date);
+            """
+        )
+        self.conn.commit()
+
+    def add_crawl(self, region, fetched_date, videos, start_rank=1):
+
+        '''
+        Store one crawled page/country: {video_id: record} in trending order.
+        start_rank is the rank of the first video (for pages after the first one).
+        '''
+
+        video_rows = []
+        snapshot_rows = []
+        for rank, (video_id, record) in enumerate(videos.items(), start=start_rank):
+            video_rows.append((
+                video_id,
+                record.get("channelId"),
+                record.get("channelTitle"),
+                record.get("title"),
+                record.get("description"),
+                json.dumps(record.get("tags"), ensure_ascii=False),
+                record.get("category"),
+                record.get("duration"),
+                int(bool(record.get("licensedContent"))),
+                json.dumps(record.get("topicCategories"), ensure_ascii=False),
+                record.get("publishedAt"),
+                fetched_date,
+                fetched_date,
+            ))
+            snapshot_rows.append((
+                video_id,
+                region,
+                fetched_date,
+                rank,
+                record.get("viewCount"),
+                record.get("likeCount"),
+                record.get("commentCount"),
+            ))
+
+        with self.lock:
+            # Metadata is written once, later crawls only move last_seen (and pick up edited titles)
+            self.conn.executemany(
+                "INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (video_id) DO UPDATE SET "
+                "title = excluded.title, "
+                "last_seen = MAX(last_seen, excluded.last_seen), "
+                "first_seen = MIN(first_seen, excluded.first_seen)",
+                video_rows,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                snapshot_rows,
+            )
+            self.conn.commit()
+        return len(snapshot_rows)
+
+    def _query(self, sql, params):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def video(self, video_id):
+        rows = self._query("SELECT * FROM videos WHERE video_id = ?", (video_id,))
+        return rows[0] if rows else None
+
+    def trajectory(self, video_id, region=None):
+
+        '''
+        Counters and rank of a video over time, oldest first
+        '''
+
+        sql = "SELECT fetched_date, region, rank, view_count, like_count, comment_count FROM snapshots WHERE video_id = ?"
+        params = [video_id]
+        if region:
+            sql += " AND region = ?"
+            params.append(region)
+        return self._query(sql + " ORDER BY fetched_date, region", params)
+
+    def channel_snapshots(self, channel_id, start=None, end=None):
+
+        '''
+        Every snapshot of the videos of a channel, optionally within [start, end]
+        (ISO timestamps, same format as fetchedDate)
+        '''
+
+        sql = (
+            "SELECT s.*, v.title FROM snapshots s JOIN videos v ON v.video_id = s.video_id "
+            "WHERE v.channel_id = ?"
+        )
+        params = [channel_id]
+        sql, params = self._time_range(sql, params, start, end)
+        return self._query(sql + " ORDER BY s.fetched_date, s.region, s.rank", params)
+
+    def snapshots_between(self, start=None, end=None, region=None):
+        sql = "SELECT s.* FROM snapshots s WHERE 1 = 1"
+        params = []
+        if region:
+            sql += " AND s.region = ?"
+            params.append(region)
+        sql, params = self._time_range(sql, params, start, end)
+        return self._query(sql + " ORDER BY s.fetched_date, s.region, s.rank", params)
+
+    def _time_range(self, sql, params, start, end):
+        if start:
+            sql += " AND s.fetched_date >= ?"
+            params.append(start)
+        if end:
+            sql += " AND s.fetched_date <= ?"
+            params.append(end)
+        return sql, params
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,12 +1,21 @@
+import glob
 import time
 import requests
 import json
 import re
 from collections import Counter
+from contextlib import nullcontext
 import os
 from datetime import datetime, timezone
 from tqdm import tqdm
 
+from yt_columnar import read_parquet_records, write_parquet
+from yt_features import compute_features, is_short, page_features, parse_duration_seconds
+from yt_pages import aiter_pages, iter_pages
+from yt_records import json_default, make_record
+from yt_transport import get_default_transport
+from yt_writers import NDJSONWriter, read_ndjson
+
 class YTStatsProMax:
     
     RECORDED_UTC_TIME = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -46,12 +55,37 @@ class YTStatsProMax:
         "43": "Shows",
         "44": "Trailers"
     }
+    
+    # videos.list and channels.list accept at most 50 ids per call
+    VIDEO_BATCH_SIZE = 50
+    CHANNEL_BATCH_SIZE = 50
 
-    def __init__(self, api_key, channel_id):
+    def __init__(self, api_key, channel_id, transport=None, show_progress=True, compact_records=False,
+                 text_fields="keep", playlist_max_pages=3, playlist_max_items=None):
         self.api_key = api_key
         self.channel_id = channel_id
         self.channel_statistics = None
         self.video_data = {}
+        # Filled from the playlist listing, used to find the previous dump of the channel
+        # and to name the dumps
+        self.channel_title = None
+        # Each stage (listing, hydration, statistics) runs at most once per instance,
+        # every later call and dump reuses its result (a stage cut short by an error runs again)
+        self.channel_videos = None
+        self.videos_fetched = False
+        # Set when a playlist page failed during the current listing
+        self.listing_failed = False
+        # Pooled session with retries, shared between instances crawling in parallel
+        self.transport = transport or get_default_transport()
+        # Request counters come from the transport, the stages below add their timings
+        self.metrics = self.transport.metrics
+        self.show_progress = show_progress
+        # Compact in-memory records and what to do with description/tags, see yt_records.py
+        self.compact_records = compact_records
+        self.text_fields = text_fields
+        # Pages (of 50 videos) / videos read from each playlist, None for all of them
+        self.playlist_max_pages = playlist_max_pages
+        self.playlist_max_items = playlist_max_items
 
     def _make_request(self, url):
 
@@ -60,16 +94,7 @@ class YTStatsProMax:
         (This is AI generated so I don't know shit)
         '''
         
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error: Received status code {response.status_code} from YouTube API.")
-                print(f"Response: {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Network error occurred: {e}")
-        return None
+        return _request_json(self.transport, url)
 
 
     def get_channel_statistics(self):
@@ -78,36 +103,23 @@ class YTStatsProMax:
         fetch channel statistics
         basically it presses on the link and fetch those statistics
         in self.channel_statistics.
+        channelCategory comes from the video data fetched so far and stays None
+        until there is some. extract_channel_statistics() crawls the videos for it
+        (get_channel_category()) before dumping, dump_channel_statistics() alone fills
+        it only from videos already fetched.
+        Fetched once, later calls return the same statistics.
         '''
         
-        url = f'https://www.googleapis.com/youtube/v3/channels?part=snippet,statistics&id={self.channel_id}&key={self.api_key}'
-        data = self._make_request(url)
-        if not data:
-            print("Error: Failed to fetch channel statistics.")
+        if self.channel_statistics:
+            if self.channel_statistics.get('channelCategory') is None and self.video_data:
+                self.channel_statistics['channelCategory'] = most_common_category(self.video_data)
+            return self.channel_statistics
+
+        video_data = {self.channel_id: self.video_data} if self.video_data else None
+        statistics = get_bulk_channel_statistics(self.api_key, [self.channel_id], self.transport, video_data)
+        if self.channel_id not in statistics:
             return {}
-
-        try:
-            items = data.get('items', [])
-            if not items:
-                print("Error: No items found in channel statistics response.")
-                return {}
-
-            overall_channel_data = items[0]['statistics']
-            additional_channel_data = items[0]['snippet']
-            
-
-            self.channel_statistics = {
-                'channelTitle': additional_channel_data['title'],
-                'viewCount': int(overall_channel_data.get('viewCount', 0)),
-                'subscriberCount': int(overall_channel_data.get('subscriberCount', 0)),
-                'videoCount': int(overall_channel_data.get('videoCount', 0)),
-                'country': additional_channel_data.get('country', None),
-                'channelCategory': self.get_channel_category()
-            }
-            
-        except (KeyError, IndexError) as e:
-            print(f"Error processing channel statistics: {e}")
-            self.channel_statistics = {}
+        self.channel_statistics = statistics[self.channel_id]
         return self.channel_statistics
     
     
@@ -118,91 +130,269 @@ class YTStatsProMax:
         Get channelCategory logic: 
         count all category id in all videos of channel, 
         return the most frequent category
+        (crawls the videos if they were not fetched yet)
         '''
         
         if not self.video_data:
             self.get_channel_video_data()
 
-        categories = [video['category'] for video in self.video_data.values()]
-        if not categories:
-            return "Unknown"
-
-        category_count = Counter(categories)
-        most_common_category = category_count.most_common(1)
-
-        return most_common_category[0][0] if most_common_category else "Unknown"
+        return most_common_category(self.video_data)
 
 
     # Get video data from the URL with progress bar
-    def get_channel_video_data(self):
-        channel_videos = self._get_channel_videos(limit=50)
+    def get_channel_video_data(self, previous_directory=None, stream_directory=None, compression=None):
+        
+        '''
+        Fetch every video of the channel.
+        With previous_directory, the newest dump of this channel in that directory
+        is reused: only new videos are fully fetched, the known ones just get
+        their statistics refreshed (snippet/topicDetails never change).
+        With stream_directory, every batch is also written to an NDJSON dump
+        (see yt_writers.NDJSONWriter) as soon as it is fetched.
+        The videos are only fetched once, later calls return self.video_data
+        (a fetch stopped by an error keeps the batches it got, the next call tries again).
+        '''
+        
+        if self.videos_fetched:
+            return self.video_data
+
+        channel_videos = self.channel_videos
+        if channel_videos is None:
+            self.listing_failed = False
+            channel_videos = self._get_channel_videos(limit=50)
+            if not self.listing_failed:
+                # Only a complete listing is kept, otherwise the next call lists again
+                self.channel_videos = channel_videos
         if not channel_videos:
             print("Error: No videos found for this channel.")
             return {}
         
         print(f"Total videos found: {len(channel_videos)}")
 
-        for video_id in tqdm(channel_videos.keys(), desc="Fetching video data"):
-            video_url = f'https://www.googleapis.com/youtube/v3/videos?part=snippet,statistics,contentDetails,topicDetails&id={video_id}&key={self.api_key}'
-            data = self._make_request(video_url)
-            if not data:
-                print(f"Error: Failed to fetch data for video ID {video_id}.")
+        previous_data = self.load_previous_video_data(previous_directory) if previous_directory else {}
+        new_ids = [video_id for video_id in channel_videos if video_id not in previous_data]
+        known_ids = [video_id for video_id in channel_videos if video_id in previous_data]
+        if previous_data:
+            print(f"{len(new_ids)} new videos, refreshing statistics of {len(known_ids)} known videos")
+
+        writer = None
+        if stream_directory:
+            filename = self._generate_safe_filename(
+                prefix=time.strftime('%y.%d.%m'),
+                title=self.channel_title or self.channel_id,
+                suffix="videos.ndjson"
+            )
+            writer = NDJSONWriter(os.path.join(stream_directory, filename), compression)
+
+        video_data = {}
+        try:
+            with writer or nullcontext(), tqdm(total=len(channel_videos), desc="Fetching video data", disable=not self.show_progress) as pbar:
+                for start in range(0, len(new_ids), self.VIDEO_BATCH_SIZE):
+                    batch_ids = new_ids[start:start + self.VIDEO_BATCH_SIZE]
+                    items = self._fetch_video_batch(batch_ids)
+
+                    with self.metrics.stage("features"):
+                        batch_records = self._process_video_batch(batch_ids, items)
+                    video_data.update(batch_records)
+                    if writer:
+                        with self.metrics.stage("serialization"):
+                            writer.write_many(batch_records)
+                    pbar.update(len(batch_ids))
+
+                for start in range(0, len(known_ids), self.VIDEO_BATCH_SIZE):
+                    batch_ids = known_ids[start:start + self.VIDEO_BATCH_SIZE]
+                    items = self._fetch_video_batch(batch_ids, parts="statistics")
+
+                    with self.metrics.stage("features"):
+                        batch_records = self._refresh_video_batch(batch_ids, items, previous_data)
+                    video_data.update(batch_records)
+                    if writer:
+                        with self.metrics.stage("serialization"):
+                            writer.write_many(batch_records)
+                    pbar.update(len(batch_ids))
+        finally:
+            # Keep the playlist order whatever path a video went through,
+            # batches fetched before an error (e.g. QuotaExceeded) are kept too
+            for video_id in channel_videos:
+                if video_id in video_data:
+                    self.video_data[video_id] = video_data[video_id]
+
+        if writer:
+            print(f"{writer.count} videos streamed to {writer.path}")
+
+        self.videos_fetched = self.channel_videos is not None
+        return self.video_data
+    
+    
+    def _fetch_video_batch(self, video_ids, parts="snippet,statistics,contentDetails,topicDetails"):
+        
+        '''
+        Fetch up to VIDEO_BATCH_SIZE videos in a single videos.list call.
+        The API silently drops private/deleted ids from the response,
+        so the items are matched back by id and the missing ones reported.
+        Returns a dict of video_id -> raw item.
+        '''
+        
+        ids = ",".join(video_ids)
+        video_url = f'https://www.googleapis.com/youtube/v3/videos?part={parts}&id={ids}&key={self.api_key}'
+        data = self._make_request(video_url)
+        if not data:
+            print(f"Error: Failed to fetch data for {len(video_ids)} video IDs starting at {video_ids[0]}.")
+            return {}
+
+        items = {}
+        for item in data.get('items', []):
+            if 'id' in item:
+                items[item['id']] = item
+
+        for video_id in video_ids:
+            if video_id not in items:
+                print(f"Error: No items found for video ID {video_id}.")
+        return items
+    
+    
+    def _refresh_video_batch(self, batch_ids, items, previous_data):
+        
+        '''
+        Update the video records of a previous dump with fresh statistics,
+        recomputing (for the whole batch at once) everything that depends
+        on them or on the fetch time
+        '''
+        
+        video_ids = []
+        for video_id in batch_ids:
+            if video_id not in items:
+                continue
+            if 'statistics' not in items[video_id] or 'publishedAt' not in previous_data[video_id]:
+                print(f"Error refreshing statistics for video ID {video_id}: missing statistics or publishedAt")
                 continue
+            if int(items[video_id]['statistics'].get('viewCount', 0)) == 0:
+                print(f"Skipping video ID {video_id} due to zero views.")
+                continue
+            video_ids.append(video_id)
+        if not video_ids:
+            return {}
 
-            try:
-                items = data.get('items', [])
-                if not items:
-                    print(f"Error: No items found for video ID {video_id}.")
-                    continue
-
-                video_data = items[0]
-                snippet = video_data['snippet']
-                content_details = video_data['contentDetails']
-                statistics = video_data['statistics']
-                topic_details = video_data.get('topicDetails', {})
-
-                view_count = int(statistics.get('viewCount', 0))
-                if int(view_count) == 0:
-                    print(f"Skipping video ID {video_id} due to zero views.")
-                    continue
-                
-                category_id = snippet.get('categoryId', "N/A")
-                category_name = self.CATEGORY_MAPPING.get(category_id, "Unknown")
-
-                raw_topic_categories = topic_details.get('topicCategories', None)
-                processed_topic_categories = self.process_topic_categories(raw_topic_categories)
-                
-                published_at = snippet.get('publishedAt', None)
-                exact_elapsed_days = self.calculate_exact_elapsed_days(published_at)
-                average_views_per_day = self.calculate_average_views_per_day(view_count, exact_elapsed_days)
-                
-                like_count = int(statistics.get('likeCount', 0))
-                comment_count = int(statistics.get('commentCount', 0))
-                
-                engagement_rate = round((like_count + comment_count) / view_count, 4)       
-                
-                self.video_data[video_id] = {
-                    'fetchedDate': self.RECORDED_UTC_TIME,
-                    'publishedAt': published_at,
-                    'elapsedDays': round(float(exact_elapsed_days), 4),
-                    'title': snippet.get('title', ""),
-                    'description': snippet.get('description', ""),
-                    'channelTitle': snippet.get('channelTitle', ""),
-                    'tags': snippet.get('tags', None),
-                    'category': category_name,
-                    'duration': content_details.get('duration', ""),
-                    'licensedContent': content_details.get('licensedContent', False),
-                    'viewCount': int(view_count),
-                    'avgDailyViews': round(float(average_views_per_day), 2),
-                    'likeCount': like_count,
-                    'commentCount': comment_count,
-                    'engagementRate': engagement_rate,
-                    'topicCategories': processed_topic_categories
-                }
-            except (KeyError, IndexError) as e:
-                print(f"Error processing video data for video ID {video_id}: {e}")
-                
-        return self.video_data
+        statistics = [items[video_id]['statistics'] for video_id in video_ids]
+        features = compute_features(
+            published_at=[previous_data[video_id]['publishedAt'] for video_id in video_ids],
+            view_count=[stats.get('viewCount', 0) for stats in statistics],
+            like_count=[stats.get('likeCount', 0) for stats in statistics],
+            comment_count=[stats.get('commentCount', 0) for stats in statistics],
+            recorded_utc_time=self.RECORDED_UTC_TIME,
+        )
+
+        records = {}
+        for video_id, feature in zip(video_ids, features.itertuples(index=False)):
+            record = dict(previous_data[video_id])
+            if 'durationSeconds' not in record:
+                # Dumps written before durationSeconds existed
+                record['durationSeconds'] = parse_duration_seconds(record.get('duration'))
+                record['isShort'] = bool(is_short(record['durationSeconds']))
+            record.update({
+                'fetchedDate': self.RECORDED_UTC_TIME,
+                'elapsedDays': float(feature.elapsedDays),
+                'viewCount': int(feature.viewCount),
+                'avgDailyViews': float(feature.avgDailyViews),
+                'likeCount': int(feature.likeCount),
+                'commentCount': int(feature.commentCount),
+                'engagementRate': float(feature.engagementRate),
+            })
+            records[video_id] = make_record(record, self.compact_records, self.text_fields)
+        return records
+    
+    
+    def load_previous_video_data(self, directory):
+        
+        '''
+        Load the newest *_videos dump of this channel from directory (json, ndjson,
+        or parquet under its fetchDate=.../channelId=... partition),
+        returns {} if there is none. Needs the playlist listing first (for the title).
+        '''
+        
+        if not self.channel_title:
+            return {}
+
+        # Same names as dump_video_data writes, with any date as prefix
+        filename = self._generate_safe_filename(prefix="", title=self.channel_title, suffix="videos.")
+        name_pattern = "[0-9][0-9].[0-9][0-9].[0-9][0-9]" + glob.escape(filename)
+        pattern = os.path.join(glob.escape(directory), name_pattern)
+        parquet_pattern = os.path.join(
+            glob.escape(directory), "fetchDate=*", "channelId=" + glob.escape(self.channel_id), name_pattern + "parquet"
+        )
+        dumps = [path for path in glob.glob(pattern + "*") + glob.glob(parquet_pattern) if not path.endswith(".part")]
+        if not dumps:
+            print(f"No previous dump found for {self.channel_title}, fetching everything.")
+            return {}
+
+        latest = max(dumps, key=os.path.getmtime)
+        print(f"Refreshing from previous dump {latest}")
+        try:
+            if latest.endswith(".json"):
+                with open(latest, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            if latest.endswith(".parquet"):
+                return read_parquet_records(latest)
+            return read_ndjson(latest)
+        except (OSError, ValueError, ImportError) as e:
+            print(f"Error loading previous dump {latest}: {e}")
+            return {}
+    
+    
+    def _process_video_batch(self, batch_ids, items):
+        
+        '''
+        Turn the raw videos.list items of a batch into our video records,
+        the derived columns are computed for the whole batch at once.
+        Returns {video_id: record}, skipped videos are left out.
+        '''
+        
+        valid_items = []
+        for video_id in batch_ids:
+            if video_id not in items:
+                continue
+            video_data = items[video_id]
+            missing = [part for part in ('snippet', 'contentDetails', 'statistics') if part not in video_data]
+            if missing:
+                print(f"Error processing video data for video ID {video_id}: missing {missing}")
+                continue
+            if int(video_data['statistics'].get('viewCount', 0)) == 0:
+                print(f"Skipping video ID {video_id} due to zero views.")
+                continue
+            valid_items.append(video_data)
+
+        features = page_features(valid_items, self.RECORDED_UTC_TIME, self.CATEGORY_MAPPING)
+
+        records = {}
+        for video_data, feature in zip(valid_items, features.itertuples(index=False)):
+            snippet = video_data['snippet']
+            content_details = video_data['contentDetails']
+            topic_details = video_data.get('topicDetails', {})
+
+            raw_topic_categories = topic_details.get('topicCategories', None)
+            processed_topic_categories = self.process_topic_categories(raw_topic_categories)
+            
+            records[video_data['id']] = make_record({
+                'fetchedDate': self.RECORDED_UTC_TIME,
+                'publishedAt': snippet.get('publishedAt', None),
+                'elapsedDays': float(feature.elapsedDays),
+                'title': snippet.get('title', ""),
+                'description': snippet.get('description', ""),
+                'channelTitle': snippet.get('channelTitle', ""),
+                'tags': snippet.get('tags', None),
+                'category': feature.category,
+                'duration': content_details.get('duration', ""),
+                'durationSeconds': int(feature.durationSeconds),
+                'isShort': bool(feature.isShort),
+                'licensedContent': content_details.get('licensedContent', False),
+                'viewCount': int(feature.viewCount),
+                'avgDailyViews': float(feature.avgDailyViews),
+                'likeCount': int(feature.likeCount),
+                'commentCount': int(feature.commentCount),
+                'engagementRate': float(feature.engagementRate),
+                'topicCategories': processed_topic_categories
+            }, self.compact_records, self.text_fields)
+        return records
     
     
     def process_topic_categories(self, topic_categories):
@@ -237,27 +427,6 @@ class YTStatsProMax:
         return processed_categories
     
     
-    def calculate_exact_elapsed_days(self, published_time):
-            
-        '''
-        Calculate the exact elapsed days from the published time
-        '''
-        
-        published_dt = datetime.strptime(published_time, "%Y-%m-%dT%H:%M:%SZ")
-        elapsed = datetime.strptime(self.RECORDED_UTC_TIME, "%Y-%m-%dT%H:%M:%SZ") - published_dt
-        elapsed_days = elapsed.total_seconds() / 60 / 60 / 24
-        return f'{elapsed_days:.4f}'
-    
-    
-    def calculate_average_views_per_day(self, view_count, exact_elapsed_days):
-            
-        '''
-        Calculate the average views per day
-        '''
-        
-        return f'{int(view_count) / float(exact_elapsed_days):.2f}'
-    
-    
     def _get_channel_videos(self, limit=None):
         # Generate playlist IDs for popular and short videos
         popular_playlist_id = self.channel_id[:1] + "ULP" + self.channel_id[2:]
@@ -287,38 +456,57 @@ class YTStatsProMax:
             dict: A dictionary of video IDs as keys.
         """
         videos = {}
-        next_page_token = None
-
-        for _ in range(3):  # Limit to 300 videos each channel
-            if next_page_token:
-                url_with_token = f"{url}&pageToken={next_page_token}"
-            else:
-                url_with_token = url
-
-            data = self._make_request(url_with_token)
-            if not data:
-                print("Error: Failed to fetch playlist videos.")
-                break
-
-            items = data.get('items', [])
+        for items in self.iter_playlist_pages(url):
             for item in items:
                 try:
                     video_id = item['snippet']['resourceId']['videoId']
                     videos[video_id] = {}
+                    if not self.channel_title:
+                        self.channel_title = item['snippet'].get('channelTitle')
                 except KeyError as e:
                     print(f"Error extracting video ID: {e}")
 
-            next_page_token = data.get('nextPageToken')
-            if not next_page_token:
-                break
-
         return videos
 
+    def _playlist_page_fetcher(self, url):
+        def fetch_page(page_token):
+            url_with_token = f"{url}&pageToken={page_token}" if page_token else url
+            failures = []
+            data = _request_json(self.transport, url_with_token, failures)
+            if not data:
+                print("Error: Failed to fetch playlist videos.")
+                # A missing playlist (e.g. a channel without shorts) is a complete answer
+                if failures and failures[0] != 404:
+                    self.listing_failed = True
+            return data
+        return fetch_page
+
+    def iter_playlist_pages(self, url, max_pages=None, max_items=None, prefetch=True):
+        """
+        Lazily yield the raw playlistItems of a playlist page by page,
+        the next page is fetched while the current one is handled (see yt_pages.iter_pages).
+        Args:
+            url (str): The URL of the playlist, without pageToken.
+            max_pages (int, optional): Defaults to self.playlist_max_pages.
+            max_items (int, optional): Defaults to self.playlist_max_items.
+        """
+        yield from iter_pages(self._playlist_page_fetcher(url), max_pages or self.playlist_max_pages,
+                              max_items or self.playlist_max_items, prefetch)
+
+    async def aiter_playlist_pages(self, url, max_pages=None, max_items=None, prefetch=True):
+        """Async version of iter_playlist_pages (the requests run in worker threads)."""
+        async for items in aiter_pages(self._playlist_page_fetcher(url), max_pages or self.playlist_max_pages,
+                                       max_items or self.playlist_max_items, prefetch):
+            yield items
+
     def dump_channel_statistics(self, directory=None):
         """Dump channel statistics to a JSON file."""
         if not self.channel_statistics:
             print("Error: No channel statistics to dump.")
             return
+        if self.channel_statistics.get('channelCategory') is None and self.video_data:
+            # Statistics fetched before the videos
+            self.channel_statistics['channelCategory'] = most_common_category(self.video_data)
 
         # Generate a safe filename
         filename = self._generate_safe_filename(
@@ -332,24 +520,38 @@ class YTStatsProMax:
         print(f"Channel statistics dumped to {filename}.")
 
 
-    def dump_video_data(self, directory=None):
-        """Dump video data to a JSON file."""
+    def dump_video_data(self, directory=None, output_format="json", compression=None):
+        """Dump video data to a JSON file (or NDJSON, one compact record per line, or Parquet)."""
         if not self.video_data:
             print("Error: No video data to dump.")
             return
-        if not self.channel_statistics:
+        if not self.channel_title and not self.channel_statistics:
             print("Getting channel statistics for filename")
             self.get_channel_statistics()
 
-        # Generate a safe filename
+        # Generate a safe filename (the title from the listing, no extra request)
         filename = self._generate_safe_filename(
             prefix=time.strftime('%y.%d.%m'),
-            title=self.channel_statistics['channelTitle'],
-            suffix="videos.json"
+            title=self.channel_title or (self.channel_statistics or {}).get('channelTitle') or self.channel_id,
+            suffix=f"videos.{output_format}"
         )
 
         # Dump the data using the helper function
-        self._dump_to_json(self.video_data, filename, directory)
+        if output_format == "ndjson":
+            with self.metrics.stage("serialization"), NDJSONWriter(os.path.join(directory or "", filename), compression) as writer:
+                writer.write_many(self.video_data)
+            filename = os.path.basename(writer.path)
+        elif output_format == "parquet":
+            # Partitioned by fetch date and channel under directory
+            with self.metrics.stage("serialization"):
+                filename = write_parquet(
+                    self.video_data, directory or ".",
+                    name=filename[:-len(".parquet")],
+                    partitions={"channelId": self.channel_id},
+                    fetch_date=self.RECORDED_UTC_TIME[:10],
+                )
+        else:
+            self._dump_to_json(self.video_data, filename, directory)
         print(f"Video data dumped to {filename}.")
 
 
@@ -384,21 +586,113 @@ class YTStatsProMax:
             filepath = filename
 
         # Write the data to a JSON file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        with self.metrics.stage("serialization"), open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False, default=json_default)
         
         
     #I'm too lazy to add in more methods in dump
-    def extract_video_data(self,directory=None):
-        self.get_channel_video_data()
-        self.dump_video_data(directory=directory)
+    def extract_video_data(self,directory=None,incremental=False,output_format="json",compression=None):
+        # incremental reuses the last dump in directory, see get_channel_video_data
+        previous_directory = (directory or ".") if incremental else None
+        if output_format == "ndjson":
+            # Streamed while fetching, no separate dump needed
+            self.get_channel_video_data(previous_directory, stream_directory=directory or ".", compression=compression)
+            return
+        self.get_channel_video_data(previous_directory=previous_directory)
+        self.dump_video_data(directory=directory, output_format=output_format)
     
     def extract_channel_statistics(self,directory=None):
         self.get_channel_statistics()
+        if self.channel_statistics and self.channel_statistics.get('channelCategory') is None:
+            # No videos fetched yet, crawl them so the dump always has a category
+            self.channel_statistics['channelCategory'] = self.get_channel_category()
         self.dump_channel_statistics(directory=directory)
     
     def extract_all(self,directory=None):
-        self.get_channel_statistics()
+        # Videos first so the statistics get their category without another crawl
         self.get_channel_video_data()
+        self.get_channel_statistics()
         self.dump_channel_statistics(directory=directory)
-        self.dump_video_data(directory=directory)
\ No newline at end of file
+        self.dump_video_data(directory=directory)
+
+
+def _request_json(transport, url, failures=None):
+    # GET through the shared transport, the decoded body or None (errors are printed,
+    # and the status code, None for a network error, appended to the optional failures list)
+    try:
+        response = transport.get(url)
+        if response.status_code == 200:
+            with transport.metrics.stage("json_decode"):
+                return response.json()
+        else:
+            print(f"Error: Received status code {response.status_code} from YouTube API.")
+            print(f"Response: {response.text}")
+            status = response.status_code
+    except requests.exceptions.RequestException as e:
+        print(f"Network error occurred: {e}")
+        status = None
+    if failures is not None:
+        failures.append(status)
+    return None
+
+
+def most_common_category(video_data):
+
+    '''
+    Most frequent category of {video_id: record}, "Unknown" if there is none
+    '''
+
+    categories = [video['category'] for video in video_data.values() if 'category' in video]
+    if not categories:
+        return "Unknown"
+    return Counter(categories).most_common(1)[0][0]
+
+
+def get_bulk_channel_statistics(api_key, channel_ids, transport=None, video_data=None):
+
+    '''
+    Statistics of many channels, CHANNEL_BATCH_SIZE ids per channels.list call
+    (2000 channels = 40 requests). video_data is an optional
+    {channel_id: {video_id: record}} of videos already fetched, channelCategory
+    is computed from it and left None for the other channels.
+    Returns {channel_id: statistics}, channels the API doesn't return are left out.
+    '''
+
+    transport = transport or get_default_transport()
+    video_data = video_data or {}
+    channel_ids = list(dict.fromkeys(channel_ids))
+    batch_size = YTStatsProMax.CHANNEL_BATCH_SIZE
+
+    statistics = {}
+    for start in range(0, len(channel_ids), batch_size):
+        batch_ids = channel_ids[start:start + batch_size]
+        url = (
+            f'https://www.googleapis.com/youtube/v3/channels?part=snippet,statistics'
+            f'&id={",".join(batch_ids)}&maxResults={batch_size}&key={api_key}'
+        )
+        data = _request_json(transport, url)
+        if not data:
+            print(f"Error: Failed to fetch channel statistics for {len(batch_ids)} channels starting at {batch_ids[0]}.")
+            continue
+
+        for item in data.get('items', []):
+            try:
+                overall_channel_data = item['statistics']
+                additional_channel_data = item['snippet']
+                channel_id = item['id']
+                videos = video_data.get(channel_id)
+                statistics[channel_id] = {
+                    'channelTitle': additional_channel_data['title'],
+                    'viewCount': int(overall_channel_data.get('viewCount', 0)),
+                    'subscriberCount': int(overall_channel_data.get('subscriberCount', 0)),
+                    'videoCount': int(overall_channel_data.get('videoCount', 0)),
+                    'country': additional_channel_data.get('country', None),
+                    'channelCategory': most_common_category(videos) if videos else None
+                }
+            except KeyError as e:
+                print(f"Error processing channel statistics: {e}")
+
+        for channel_id in batch_ids:
+            if channel_id not in statistics:
+                print(f"Error: No items found in channel statistics response for {channel_id}.")
+    return statistics
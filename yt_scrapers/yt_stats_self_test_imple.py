@@ -1,18 +1,19 @@
-import yt_stats_self_test_AI
-from yt_stats_self_test_AI import YTStatsProMax
+from yt_channel_crawler import crawl_channels, load_channel_ids
+from yt_checkpoint import CheckpointJournal
+from yt_keys import load_api_keys
 
 
 output_directory = 'sample_youtube_statistics'
-# Load API key from api_key.txt
-with open('api_key.txt', 'r') as f:
-    api_key = f.read().strip()
+# Load API keys from api_key.txt (one per line, requests are spread over all of them)
+api_keys = load_api_keys('api_key.txt')
 
 # Load channel IDs from channel_id.txt
-with open('channel_ids.txt', 'r') as f:
-    channel_ids = [line.strip() for line in f.readlines()]
+channel_ids = load_channel_ids('channel_ids.txt')
 
-for channel_id in channel_ids:
-    print(f"Processing channel: {channel_id}")
-    yt = YTStatsProMax(api_key, channel_id)
-    yt.extract_video_data(directory=output_directory)
-    # yt.extract_channel_statistics(directory=output_directory)
\ No newline at end of file
+# Finished channels are journaled, rerunning after a crash (or out of quota) skips them
+checkpoint = CheckpointJournal('crawl_checkpoint.jsonl')
+
+# Channels are crawled in parallel, see yt_channel_crawler.py for the CLI version
+crawl_channels(api_keys, channel_ids, directory=output_directory, workers=8, requests_per_second=10,
+               checkpoint=checkpoint)
+# crawl_channels(api_keys, channel_ids, directory=output_directory, statistics=True)
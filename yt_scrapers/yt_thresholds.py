@@ -0,0 +1,194 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from yt_labeling import iter_dataset_chunks
+from yt_sketch import KLLSketch
+
+
+# Region code in the trending file names (24.07.12_US_trending_videos.json)
+REGION_RE = re.compile(r"_([A-Z]{2})_trending_videos")
+
+# Cut the lowest 20% of the trending dataset, 10% of the channel dataset (README)
+TRENDING_QUANTILES = {"viewCount": 0.2, "likeCount": 0.2, "commentCount": 0.2, "engagementRate": 0.2, "avgDailyViews": 0.2}
+CHANNEL_QUANTILES = {"viewCount": 0.1, "likeCount": 0.1, "commentCount": 0.1, "engagementRate": 0.1, "avgDailyViews": 0.1}
+
+
+def region_of(path):
+    match = REGION_RE.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+class ThresholdFitter:
+
+    '''
+    Quantile cutoffs of the video columns, per group of videos
+    (group_by "region" and/or "date" (the day of fetchedDate), () for one global group).
+    Every column of every group gets a KLLSketch, so any number of chunks/files
+    can be fed with update() without keeping them, then mask()/filter() keep the
+    videos at or above the cutoffs of their group.
+    The sketches are exact for groups of up to exact_limit videos and seeded from seed,
+    so the same data always gives the same cutoffs.
+    '''
+
+    def __init__(self, quantiles=TRENDING_QUANTILES, group_by=("region", "date"), k=200, seed=0, exact_limit=100000):
+        self.quantiles = dict(quantiles)
+        self.group_by = tuple(group_by)
+        self.k = k
+        self.seed = seed
+        self.exact_limit = exact_limit
+        self.sketches = {}
+        self.cutoffs = None
+
+    def _with_engagement_rate(self, df):
+        if "engagementRate" in self.quantiles and "engagementRate" not in df:
+            df = df.assign(engagementRate=(df["likeCount"] + df["commentCount"]) / df["viewCount"])
+        return df
+
+    def group_keys(self, df, region=None):
+
+        '''
+        Group key of every row as "US/2024-12-07" (or "all" without group_by),
+        region comes from a region column (Parquet partitions) or the given file region
+        '''
+
+        parts = []
+        for name in self.group_by:
+            if name == "region":
+                if "region" in df:
+                    parts.append(df["region"].astype(str).to_numpy())
+                else:
+                    parts.append(np.full(len(df), region or "all", dtype=object))
+            elif name == "date":
+                fetched = df["fetchedDate"]
+                if pd.api.types.is_datetime64_any_dtype(fetched):
+                    fetched = fetched.dt.strftime("%Y-%m-%d")
+                parts.append(fetched.astype(str).str[:10].to_numpy())
+            else:
+                raise ValueError(f"Unknown group_by {name!r}, use region and/or date")
+        if not parts:
+            return np.full(len(df), "all", dtype=object)
+        keys = parts[0].astype(object)
+        for part in parts[1:]:
+            keys = keys + "/" + part.astype(object)
+        return keys
+
+    def update(self, df, region=None):
+        df = self._with_engagement_rate(df)
+        keys = self.group_keys(df, region)
+        for key in pd.unique(keys):
+            rows = df[keys == key]
+            sketches = self.sketches.get(key)
+            if sketches is None:
+                sketches = self.sketches[key] = {
+                    column: KLLSketch(self.k, seed=f"{self.seed}/{key}/{column}", exact_limit=self.exact_limit)
+                    for column in self.quantiles
+                }
+            for column, sketch in sketches.items():
+                sketch.update_many(pd.to_numeric(rows[column], errors="coerce").to_numpy(dtype="float64"))
+        self.cutoffs = None
+        return self
+
+    def thresholds(self):
+
+        '''
+        {group: {column: cutoff}}
+        '''
+
+        if self.cutoffs is None:
+            self.cutoffs = {
+                key: {column: sketch.quantile(self.quantiles[column]) for column, sketch in sketches.items()}
+                for key, sketches in self.sketches.items()
+            }
+        return self.cutoffs
+
+    def mask(self, df, region=None):
+        df = self._with_engagement_rate(df)
+        keys = self.group_keys(df, region)
+        thresholds = self.thresholds()
+        keep = np.zeros(len(df), dtype=bool)
+        for key in pd.unique(keys):
+            rows = keys == key
+            if key not in thresholds:
+                # Never seen while fitting, nothing to compare with
+                continue
+            group_keep = np.ones(rows.sum(), dtype=bool)
+            for column, cutoff in thresholds[key].items():
+                if cutoff is None:
+                    continue
+                values = pd.to_numeric(df.loc[rows, column], errors="coerce").to_numpy(dtype="float64")
+                group_keep &= values >= cutoff
+            keep[rows] = group_keep
+        return pd.Series(keep, index=df.index)
+
+    def filter(self, df, region=None):
+        return df[self.mask(df, region).to_numpy()]
+
+    def save(self, path):
+        state = {
+            "quantiles": self.quantiles,
+            "group_by": self.group_by,
+            "k": self.k,
+            "seed": self.seed,
+            "exact_limit": self.exact_limit,
+            "sketches": {
+                key: {column: sketch.to_dict() for column, sketch in sketches.items()}
+                for key, sketches in self.sketches.items()
+            },
+            "thresholds": self.thresholds(),
+        }
+        with open(path + ".part", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path):
+        # The sketches are saved too, so the next run can keep updating them with new files
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        fitter = cls(state["quantiles"], state["group_by"], state["k"], state.get("seed", 0),
+                     state.get("exact_limit", 100000))
+        fitter.sketches = {
+            key: {column: KLLSketch.from_dict(sketch) for column, sketch in sketches.items()}
+            for key, sketches in state["sketches"].items()
+        }
+        return fitter
+
+
+def fit_thresholds(paths, quantiles=TRENDING_QUANTILES, group_by=("region", "date"), chunk_size=100000, fitter=None):
+
+    '''
+    Stream every dataset file (json, ndjson or parquet) once through the sketches,
+    only one chunk is in memory at a time. Pass a loaded fitter to add new files to it.
+    '''
+
+    fitter = fitter or ThresholdFitter(quantiles, group_by)
+    for path in paths:
+        for chunk in iter_dataset_chunks(path, chunk_size):
+            fitter.update(chunk, region_of(path))
+    return fitter
+
+
+def filter_dataset(paths, output_path, quantiles=TRENDING_QUANTILES, group_by=("region", "date"), chunk_size=100000,
+                   compression=None, fitter=None):
+
+    '''
+    Fit the cutoffs over all the files (first streaming pass) and write the videos
+    above them to output_path as NDJSON (second streaming pass).
+    Returns the fitter and the number of videos kept.
+    '''
+
+    from yt_writers import NDJSONWriter
+
+    fitter = fit_thresholds(paths, quantiles, group_by, chunk_size, fitter)
+    count = 0
+    with NDJSONWriter(output_path, compression) as writer:
+        for path in paths:
+            for chunk in iter_dataset_chunks(path, chunk_size):
+                kept = fitter.filter(chunk, region_of(path))
+                writer.write_many(json.loads(kept.to_json(orient="index", force_ascii=False, double_precision=15)))
+                count += len(kept)
+    return fitter, count
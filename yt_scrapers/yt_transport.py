@@ -0,0 +1,210 @@
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from yt_metrics import get_metrics
+from yt_quota import QuotaExceeded, QuotaScheduler
+
+
+class YTTransport:
+
+    '''
+    Shared HTTP layer for YouTubeScraper, YTStatsProMax and YTstats.
+    One pooled keep-alive session (so TLS connections get reused),
+    timeouts on every call and jittered exponential backoff on 429/5xx
+    and rate limit 403s, honouring the Retry-After header when present.
+    Every attempt is charged to the optional QuotaScheduler first, and with
+    an APIKeyPool the key in the url is swapped for the next pooled one.
+    With a ResponseCache, fresh responses are served from disk and stale ones
+    are revalidated with their ETag.
+    Latency, bytes, retries, quota units and cache hits of every call go to
+    a CrawlMetrics (yt_metrics.py, the shared one by default).
+    '''
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    # 403 reasons YouTube uses for "slow down", quotaExceeded is not one of them
+    RETRY_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+    # 403 reasons meaning the key itself is done for the day
+    QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+    def __init__(self, timeout=(5, 30), max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 max_connections=10, rate_limiter=None, quota=None, key_pool=None, cache=None, metrics=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Optional limiter shared by every thread using this transport (see yt_channel_crawler.RateLimiter)
+        self.rate_limiter = rate_limiter
+        # Optional QuotaScheduler, raises QuotaExceeded before a request goes over budget
+        self.quota = quota
+        # Optional APIKeyPool, spreads the requests over many keys
+        self.key_pool = key_pool
+        # Optional ResponseCache (yt_cache.py)
+        self.cache = cache
+        self.metrics = metrics or get_metrics()
+
+        self.session = requests.Session()
+        # pool_block caps the open connections to the API host when many threads share the session
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url):
+
+        '''
+        GET the url with retries, returns the last response
+        (the caller still checks status_code like with requests.get).
+        Network errors are retried too and re-raised once retries run out.
+        '''
+
+        start = time.perf_counter()
+        endpoint = self._endpoint(url)
+        cached = self.cache.get(url) if self.cache else None
+        if cached and cached[2]:
+            self.metrics.record_request(endpoint, time.perf_counter() - start, len(cached[0]), 200, cache="hit")
+            return self._cached_response(url, cached[0])
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else None
+
+        attempt = 0
+        units = 0
+        nbytes = 0
+        while True:
+            if self.rate_limiter:
+                with self.metrics.stage("rate_limit_wait"):
+                    self.rate_limiter.wait()
+            if self.key_pool:
+                url = self._with_key(url, self.key_pool.acquire())
+            if self.quota:
+                try:
+                    with self.metrics.stage("quota_wait"):
+                        units += self.quota.acquire(url)
+                except QuotaExceeded:
+                    if not self.key_pool:
+                        self.metrics.record_request(endpoint, time.perf_counter() - start, nbytes, None, attempt, units)
+                        raise
+                    # Out of budget for this key only, try the next one
+                    self.key_pool.retire(self._key_of(url))
+                    continue
+            try:
+                with self.metrics.stage("network"):
+                    response = self.session.get(url, timeout=self.timeout, headers=headers)
+                    # Reading content here keeps the body download in the network time
+                    nbytes += len(response.content or b"")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self.metrics.record_request(endpoint, time.perf_counter() - start, nbytes, None, attempt, units)
+                    raise
+                delay = self._backoff_delay(attempt)
+            else:
+                if self.key_pool and response.status_code == 403 and self._error_reasons(response) & self.QUOTA_REASONS:
+                    self.key_pool.retire(self._key_of(url))
+                    continue
+                if response.status_code == 304 and cached:
+                    self.cache.touch(url)
+                    self.metrics.record_request(endpoint, time.perf_counter() - start, nbytes, 200, attempt, units,
+                                                cache="revalidated")
+                    return self._cached_response(url, cached[0])
+                if not self._should_retry(response) or attempt >= self.max_retries:
+                    if self.cache and response.status_code == 200:
+                        self.cache.put(url, response.content, response.headers.get("ETag"))
+                    self.metrics.record_request(endpoint, time.perf_counter() - start, nbytes,
+                                                response.status_code, attempt, units)
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+
+            attempt += 1
+            with self.metrics.stage("backoff"):
+                time.sleep(delay)
+
+    def _cached_response(self, url, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = "application/json; charset=UTF-8"
+        return response
+
+    def _should_retry(self, response):
+        if response.status_code in self.RETRY_STATUS:
+            return True
+        if response.status_code == 403:
+            return bool(self._error_reasons(response) & self.RETRY_REASONS)
+        return False
+
+    def _error_reasons(self, response):
+
+        '''
+        Return the set of `reason` values of a YouTube API error body
+        '''
+
+        try:
+            errors = response.json().get("error", {}).get("errors", [])
+        except ValueError:
+            return set()
+        return {error.get("reason") for error in errors if isinstance(error, dict)}
+
+    def _endpoint(self, url):
+        # "videos", "channels", "playlistItems", ... like QuotaScheduler.cost
+        return urlparse(url).path.rstrip("/").rsplit("/", 1)[-1] or "unknown"
+
+    def _key_of(self, url):
+        return parse_qs(urlparse(url).query).get("key", [None])[0]
+
+    def _with_key(self, url, key):
+        if re.search(r"[?&]key=", url):
+            return re.sub(r"([?&]key=)[^&]*", lambda match: match.group(1) + key, url)
+        return f"{url}{'&' if '?' in url else '?'}key={key}"
+
+    def _backoff_delay(self, attempt):
+        # "Equal jitter": half of the exponential delay is fixed, the other half random
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry_after(self, response):
+
+        '''
+        Parse Retry-After, which is either a number of seconds or an HTTP date
+        '''
+
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return min(self.backoff_max, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return min(self.backoff_max, max(0.0, seconds))
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport():
+
+    '''
+    Transport shared by every scraper instance that is not given its own
+    '''
+
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = YTTransport(quota=QuotaScheduler())
+        return _default_transport
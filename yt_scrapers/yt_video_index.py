@@ -0,0 +1,190 @@
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+
+
+class VideoIndex:
+
+    '''
+    Persistent cross-region index of trending videos (SQLite).
+    `video_regions` has one row per (video, region) with its first/last seen time and
+    best rank there, `video_index` one row per video with the totals over all regions
+    (first/last seen, best rank, region_count). Both are keyed by video id, so
+    "where did this video trend" or "videos trending in 5+ countries" are index
+    lookups instead of re-reading every region file.
+    '''
+
+    def __init__(self, path="yt_video_index.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS video_regions (
+                video_id TEXT NOT NULL,
+                region TEXT NOT NULL,
+                first_seen TEXT,
+                last_seen TEXT,
+                best_rank INTEGER,
+                PRIMARY KEY (video_id, region)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS video_index (
+                video_id TEXT PRIMARY KEY,
+                channel_id TEXT,
+                title TEXT,
+                first_seen TEXT,
+                last_seen TEXT,
+                best_rank INTEGER,
+                region_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_video_index_region_count ON video_index (region_count);
+            CREATE INDEX IF NOT EXISTS idx_video_regions_region ON video_regions (region, last_seen);
+            """
+        )
+        self.conn.commit()
+
+    def add_page(self, region, fetched_date, videos, start_rank=1):
+
+        '''
+        Index one crawled page/country: {video_id: record} in trending order,
+        start_rank is the rank of the first video (for pages after the first one)
+        '''
+
+        region_rows = []
+        video_rows = []
+        for rank, (video_id, record) in enumerate(videos.items(), start=start_rank):
+            region_rows.append((video_id, region, fetched_date, fetched_date, rank))
+            video_rows.append((video_id, record.get("channelId"), record.get("title"), fetched_date, fetched_date, rank))
+        if not region_rows:
+            return 0
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO video_regions VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (video_id, region) DO UPDATE SET "
+                "first_seen = MIN(first_seen, excluded.first_seen), "
+                "last_seen = MAX(last_seen, excluded.last_seen), "
+                "best_rank = MIN(best_rank, excluded.best_rank)",
+                region_rows,
+            )
+            self.conn.executemany(
+                "INSERT INTO video_index (video_id, channel_id, title, first_seen, last_seen, best_rank) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (video_id) DO UPDATE SET "
+                "title = excluded.title, "
+                "first_seen = MIN(first_seen, excluded.first_seen), "
+                "last_seen = MAX(last_seen, excluded.last_seen), "
+                "best_rank = MIN(best_rank, excluded.best_rank)",
+                video_rows,
+            )
+            # Only the videos of this page can have a new region
+            self.conn.executemany(
+                "UPDATE video_index SET region_count = "
+                "(SELECT COUNT(*) FROM video_regions r WHERE r.video_id = video_index.video_id) "
+                "WHERE video_id = ?",
+                [(row[0],) for row in video_rows],
+            )
+            self.conn.commit()
+        return len(region_rows)
+
+    def _query(self, sql, params):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def lookup(self, video_id):
+
+        '''
+        Totals of a video plus its per-region rows, None if it never trended
+        '''
+
+        rows = self._query("SELECT * FROM video_index WHERE video_id = ?", (video_id,))
+        if not rows:
+            return None
+        video = rows[0]
+        video["regions"] = self.regions(video_id)
+        return video
+
+    def regions(self, video_id):
+        return self._query(
+            "SELECT region, first_seen, last_seen, best_rank FROM video_regions WHERE video_id = ? ORDER BY region",
+            (video_id,),
+        )
+
+    def trending_in(self, min_regions, since=None):
+
+        '''
+        Videos that trended in at least min_regions regions
+        (optionally still seen since the given time), most widespread first
+        '''
+
+        sql = "SELECT * FROM video_index WHERE region_count >= ?"
+        params = [min_regions]
+        if since:
+            sql += " AND last_seen >= ?"
+            params.append(since)
+        return self._query(sql + " ORDER BY region_count DESC, best_rank", params)
+
+    def region_videos(self, region, since=None):
+        sql = "SELECT * FROM video_regions WHERE region = ?"
+        params = [region]
+        if since:
+            sql += " AND last_seen >= ?"
+            params.append(since)
+        return self._query(sql + " ORDER BY best_rank", params)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def index_files(index, paths):
+
+    '''
+    Backfill the index from trending dumps already on disk (json or ndjson),
+    the region comes from the file name and the rank from the file order
+    '''
+
+    from yt_jsonstream import iter_records
+    from yt_thresholds import region_of
+
+    count = 0
+    for path in paths:
+        region = region_of(path)
+        if not region:
+            print(f"Skipping {path}, no region in the file name")
+            continue
+        videos = dict(iter_records(path))
+        if not videos:
+            continue
+        fetched_date = next(iter(videos.values())).get("fetchedDate")
+        count += index.add_page(region, fetched_date, videos)
+        print(f"Indexed {len(videos)} videos of {region} from {path}")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index_path", help="SQLite file of the video index", default="yt_video_index.sqlite")
+    parser.add_argument("--trending_dir", help="Index the trending dumps of this directory first", default=None)
+    parser.add_argument("--min_regions", help="List the videos trending in at least this many regions", type=int, default=5)
+
+    args = parser.parse_args()
+
+    index = VideoIndex(args.index_path)
+    if args.trending_dir:
+        paths = sorted(glob.glob(os.path.join(glob.escape(args.trending_dir), "*_trending_videos.*")))
+        index_files(index, [path for path in paths if not path.endswith(".part")])
+
+    videos = index.trending_in(args.min_regions)
+    print(f"{len(videos)} videos trending in {args.min_regions}+ regions")
+    for video in videos:
+        print(f"{video['region_count']:>3} regions, best rank {video['best_rank']:>3}: {video['title']}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
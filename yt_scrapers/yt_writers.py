@@ -0,0 +1,141 @@
+import gzip
+import io
+import json
+import os
+
+
+COMPRESSION_EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class NDJSONWriter:
+
+    '''
+    Streaming writer, one compact JSON record per line ({"videoId": ..., **record}).
+    Records go to "<path>.part" as they arrive and the file is renamed to its
+    final name only on close(), so a crashed run leaves a readable .part file
+    instead of a truncated dataset. Optionally gzip or zstd compressed.
+    '''
+
+    def __init__(self, path, compression=None):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression {compression!r}, use one of {list(COMPRESSION_EXTENSIONS)}")
+
+        self.path = path + COMPRESSION_EXTENSIONS[compression]
+        self.part_path = self.path + ".part"
+        self.compression = compression
+        self.count = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.raw = open(self.part_path, "wb")
+        if compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode="wb")
+        elif compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                self.raw.close()
+                os.remove(self.part_path)
+                raise ImportError("zstd compression needs the zstandard package (pip install zstandard)")
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+        self.text = io.TextIOWrapper(self.stream, encoding="utf-8", write_through=True)
+
+    def write(self, video_id, record):
+        line = json.dumps({"videoId": video_id, **record}, ensure_ascii=False, separators=(",", ":"))
+        self.text.write(line + "\n")
+        self.count += 1
+
+    def write_many(self, records):
+
+        '''
+        Write a page of {video_id: record} and flush it, so it is on disk
+        (and decompressible) even if the run dies on the next page
+        '''
+
+        for video_id, record in records.items():
+            self.write(video_id, record)
+        self.flush()
+
+    def flush(self):
+        self.text.flush()
+        if self.compression == "gzip":
+            self.stream.flush()
+        elif self.compression == "zstd":
+            import zstandard
+            self.stream.flush(zstandard.FLUSH_BLOCK)
+        self.raw.flush()
+
+    def close(self):
+
+        '''
+        Finish the file and atomically move it to its final name
+        '''
+
+        self.text.flush()
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        self.raw.close()
+        os.replace(self.part_path, self.path)
+
+    def abort(self):
+        # Keep whatever was written as .part, just release the file
+        try:
+            self.text.flush()
+            if self.stream is not self.raw:
+                self.stream.close()
+        finally:
+            self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def open_text(path):
+    # Text stream of a possibly compressed file, the compression is picked from the extension
+    name = path[:-len(".part")] if path.endswith(".part") else path
+    if name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if name.endswith(".zst"):
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_ndjson(path):
+
+    '''
+    Yield (video_id, record) from an NDJSON file written by NDJSONWriter,
+    the compression is picked from the extension (a .part file works too)
+    '''
+
+    with open_text(path) as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line of a crashed .part file can be cut in half
+                    break
+                yield record.pop("videoId", None), record
+        except EOFError:
+            # Compressed .part file without its end marker
+            return
+
+
+def read_ndjson(path):
+    return dict(iter_ndjson(path))